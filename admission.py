@@ -0,0 +1,139 @@
+# admission.py
+# Admission control in front of the routes that contend for the SQLite writer and the
+# forest. Each request is put in a priority class (analyst updates, then new incidents,
+# then predictions, then dashboard reads). A class runs at most `limit` requests at a
+# time and queues up to `queue` more, FIFO. Lower classes also leave `reserve` slots of
+# the shared budget free for the classes above them. When a class's queue is full the
+# request gets 429 right away; if it waits longer than `max_wait` it gets 503. Both
+# carry Retry-After.
+import os
+import re
+import math
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+
+from fastapi.responses import ORJSONResponse
+
+ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+TOTAL = int(os.environ.get("ADMISSION_TOTAL", 32))  # below anyio's 40 worker threads
+
+def _env(name, key, default):
+    return type(default)(os.environ.get(f"ADMISSION_{name.upper()}_{key}", default))
+
+@dataclass
+class PriorityClass:
+    name: str
+    priority: int
+    limit: int
+    queue: int
+    max_wait: float
+    reserve: int = 0
+    running: int = 0
+    waiters: deque = field(default_factory=deque)
+    service_seconds: float = 0.05  # EWMA of handler time, for Retry-After
+
+def priority_class(name, priority, limit, queue, max_wait, reserve=0):
+    return PriorityClass(name, priority, _env(name, "LIMIT", limit), _env(name, "QUEUE", queue),
+                         _env(name, "MAX_WAIT", max_wait), _env(name, "RESERVE", reserve))
+
+class Rejected(Exception):
+    def __init__(self, status_code, retry_after):
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class Limiter:
+    def __init__(self, classes, total=TOTAL):
+        self.classes = sorted(classes, key=lambda c: c.priority)
+        self.total = total
+        self.running = 0
+
+    def _can_start(self, c):
+        return c.running < c.limit and self.running < self.total - c.reserve
+
+    def _start(self, c):
+        c.running += 1
+        self.running += 1
+
+    def _retry_after(self, c):
+        backlog = len(c.waiters) + c.running + 1
+        return min(max(math.ceil(backlog * c.service_seconds / max(c.limit, 1)), 1), 30)
+
+    async def acquire(self, c):
+        if not c.waiters and self._can_start(c):
+            self._start(c)
+            return
+        if len(c.waiters) >= c.queue:
+            raise Rejected(429, self._retry_after(c))
+        waiter = asyncio.get_running_loop().create_future()
+        c.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, c.max_wait)
+        except asyncio.TimeoutError:
+            raise Rejected(503, self._retry_after(c))
+        except asyncio.CancelledError:
+            # Client went away; hand the slot back if it was granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(c)
+            raise
+        finally:
+            if waiter in c.waiters:
+                c.waiters.remove(waiter)
+
+    def release(self, c, elapsed=None):
+        c.running -= 1
+        self.running -= 1
+        if elapsed is not None:
+            c.service_seconds += 0.1 * (elapsed - c.service_seconds)
+        # Highest priority first; a class at its own limit doesn't block the ones below it
+        for cls in self.classes:
+            while cls.waiters and self._can_start(cls):
+                waiter = cls.waiters.popleft()
+                if not waiter.done():
+                    self._start(cls)
+                    waiter.set_result(None)
+
+UPDATE = priority_class("update", 0, limit=16, queue=64, max_wait=10.0)
+SUBMIT = priority_class("submit", 1, limit=2, queue=64, max_wait=5.0, reserve=4)
+PREDICT = priority_class("predict", 2, limit=1, queue=32, max_wait=2.0, reserve=8)
+DASHBOARD = priority_class("dashboard", 3, limit=2, queue=32, max_wait=2.0, reserve=8)
+LIMITER = Limiter([UPDATE, SUBMIT, PREDICT, DASHBOARD])
+
+# (method, path pattern) -> class; anything unmatched (login, signup, group admin, docs) is not limited
+ROUTES = [
+    ("POST", re.compile(r"^/incidents/\d+/(update|assign)$"), UPDATE),
+    ("POST", re.compile(r"^/incidents$"), SUBMIT),
+    ("POST", re.compile(r"^/predict_resolution_time(/batch)?$"), PREDICT),
+    ("GET", re.compile(r"^/(incidents?|dashboard_stats|analytics|sla|drift)(/|$)"), DASHBOARD),
+]
+
+def classify(method, path):
+    for m, pattern, c in ROUTES:
+        if m == method and pattern.match(path):
+            return c
+    return None
+
+class AdmissionControl:
+    """Pure ASGI middleware, so admitted requests pay no extra response wrapping."""
+
+    def __init__(self, app, limiter=LIMITER):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        c = classify(scope["method"], scope["path"]) if ENABLED and scope["type"] == "http" else None
+        if c is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.limiter.acquire(c)
+        except Rejected as r:
+            detail = "Too many queued requests" if r.status_code == 429 else "Server busy"
+            response = ORJSONResponse({"detail": f"{detail}, retry later", "class": c.name}, status_code=r.status_code,
+                                      headers={"Retry-After": str(r.retry_after)})
+            return await response(scope, receive, send)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(c, loop.time() - started)
@@ -0,0 +1,223 @@
+# analytics.py
+import sys
+import math
+import datetime
+from typing import Optional, TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, func, delete, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from db_config import (SessionLocal, init_db, get_db, as_utc, Group, Incident, ArchivedIncident, AnalyticsRollup,
+                       AnalyticsResolutionHist)
+from auth import TokenUser, current_user
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+GRANULARITIES = {"hour": "h", "day": "D"}
+DEFAULT_WINDOW = {"hour": datetime.timedelta(hours=48), "day": datetime.timedelta(days=30)}
+
+# Resolution hours go into log-scale bins, two per doubling starting at 6 minutes,
+# so percentiles read back within ~19% of the exact value
+BIN_BASE_HOURS = 0.1
+BINS_PER_DOUBLING = 2
+N_BINS = 48
+
+def hours_bin(hours):
+    b = math.floor(BINS_PER_DOUBLING * math.log2(max(hours, BIN_BASE_HOURS) / BIN_BASE_HOURS))
+    return min(max(b, 0), N_BINS - 1)
+
+def bin_midpoint(b):
+    return BIN_BASE_HOURS * 2 ** ((b + 0.5) / BINS_PER_DOUBLING)
+
+def bucket_start(dt, granularity):
+    dt = as_utc(dt).replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0) if granularity == "day" else dt
+
+# Incremental maintenance, called inside the create/update transaction
+def _bump(db, granularity, start, group_id, ptype, created=0, closed=0, hours=0.0):
+    stmt = sqlite_insert(AnalyticsRollup).values(
+        granularity=granularity, bucket_start=start, group_id=group_id, type=ptype,
+        created_count=created, closed_count=closed, resolution_hours_sum=hours)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "group_id", "type"],
+        set_={
+            "created_count": AnalyticsRollup.created_count + stmt.excluded.created_count,
+            "closed_count": AnalyticsRollup.closed_count + stmt.excluded.closed_count,
+            "resolution_hours_sum": AnalyticsRollup.resolution_hours_sum + stmt.excluded.resolution_hours_sum,
+        }))
+
+def _bump_hist(db, granularity, start, group_id, ptype, b):
+    stmt = sqlite_insert(AnalyticsResolutionHist).values(
+        granularity=granularity, bucket_start=start, group_id=group_id, type=ptype, bin=b, count=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "group_id", "type", "bin"],
+        set_={"count": AnalyticsResolutionHist.count + 1}))
+
+def record_created(db, group_id, ptype, created_at):
+    for g in GRANULARITIES:
+        _bump(db, g, bucket_start(created_at, g), group_id, ptype, created=1)
+
+def record_closed(db, group_id, ptype, created_at, closed_at):
+    hours = (as_utc(closed_at) - as_utc(created_at)).total_seconds() / 3600.0
+    if hours < 0:
+        return
+    for g in GRANULARITIES:
+        start = bucket_start(closed_at, g)
+        _bump(db, g, start, group_id, ptype, closed=1, hours=hours)
+        _bump_hist(db, g, start, group_id, ptype, hours_bin(hours))
+
+# Backfill from history. numpy/pandas are imported here rather than at module
+# level, so the API process only loads them if a backfill actually runs.
+def infer_types(title: "pd.Series", description: "pd.Series") -> "pd.Series":
+    # Vectorized routing.infer_type: same keywords, same precedence
+    import numpy as np
+    import pandas as pd
+    text = (title.fillna("") + " " + description.fillna("")).str.lower()
+    conds = [
+        text.str.contains("network|vpn|wifi"),
+        text.str.contains("server|database|db"),
+        text.str.contains("bug|error|ui|app"),
+    ]
+    return pd.Series(np.select(conds, ["Network", "Infra", "Software"], default="General"), index=text.index)
+
+def build_rollups(df: "pd.DataFrame"):
+    """Turn incident rows (assigned_group_id, title, description, created_at, first_closed_at) into rollup and histogram frames.
+
+    An incident's close is counted at its first close, as the live hook counts it."""
+    import numpy as np
+    import pandas as pd
+    df = df.assign(
+        type=infer_types(df["title"], df["description"]),
+        created_at=pd.to_datetime(df["created_at"], utc=True, format="mixed"),
+        closed_at=pd.to_datetime(df["first_closed_at"], utc=True, format="mixed"),
+    ).rename(columns={"assigned_group_id": "group_id"})
+    closed = df[df["closed_at"].notna()].copy()
+    closed["hours"] = (closed["closed_at"] - closed["created_at"]).dt.total_seconds() / 3600.0
+    closed = closed[closed["hours"] >= 0]
+    closed["bin"] = np.clip(np.floor(BINS_PER_DOUBLING * np.log2(np.maximum(closed["hours"], BIN_BASE_HOURS) / BIN_BASE_HOURS)),
+                            0, N_BINS - 1).astype(int)
+
+    rollups, hists = [], []
+    keys = ["bucket_start", "group_id", "type"]
+    for g, freq in GRANULARITIES.items():
+        created = df.assign(bucket_start=df["created_at"].dt.floor(freq)).groupby(keys).size().rename("created_count")
+        c = closed.assign(bucket_start=closed["closed_at"].dt.floor(freq))
+        agg = c.groupby(keys).agg(closed_count=("hours", "size"), resolution_hours_sum=("hours", "sum"))
+        r = pd.concat([created, agg], axis=1).fillna(0).reset_index()
+        rollups.append(r.assign(granularity=g))
+        hists.append(c.groupby(keys + ["bin"]).size().rename("count").reset_index().assign(granularity=g))
+    rollups = pd.concat(rollups, ignore_index=True).astype({"created_count": int, "closed_count": int})
+    return rollups, pd.concat(hists, ignore_index=True)
+
+def _records(frame):
+    frame = frame.copy()
+    frame["bucket_start"] = frame["bucket_start"].dt.tz_convert("UTC").dt.to_pydatetime()
+    return frame.to_dict("records")
+
+def backfill(db, frame: Optional["pd.DataFrame"] = None):
+    """Rebuild every rollup from scratch. Run it with writes paused; live updates go through record_*."""
+    if frame is None:
+        import pandas as pd
+        # Archived incidents count too: the rollups cover the whole history
+        q = union_all(*[select(t.c.assigned_group_id, t.c.title, t.c.description, t.c.created_at, t.c.first_closed_at)
+                        for t in (Incident.__table__, ArchivedIncident)])
+        frame = pd.read_sql(q, db.get_bind())
+    rollups, hists = build_rollups(frame)
+    db.execute(delete(AnalyticsRollup)); db.execute(delete(AnalyticsResolutionHist))
+    if len(rollups):
+        db.bulk_insert_mappings(AnalyticsRollup, _records(rollups))
+    if len(hists):
+        db.bulk_insert_mappings(AnalyticsResolutionHist, _records(hists))
+    db.commit()
+    return len(rollups), len(hists)
+
+# Read side: rollups only, never the incident tables
+def _window(granularity, start, end):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {sorted(GRANULARITIES)}")
+    end = as_utc(end) if end else datetime.datetime.now(datetime.timezone.utc)
+    start = as_utc(start) if start else end - DEFAULT_WINDOW[granularity]
+    return bucket_start(start, granularity), end
+
+def _filters(model, granularity, start, end, group_id, ptype):
+    f = [model.granularity == granularity, model.bucket_start >= start, model.bucket_start <= end]
+    if group_id is not None:
+        f.append(model.group_id == group_id)
+    if ptype:
+        f.append(model.type == ptype)
+    return f
+
+def _group_lookup(db, group_name):
+    names = dict(db.query(Group.id, Group.name).all())
+    if group_name is None:
+        return names, None
+    ids = [i for i, n in names.items() if n == group_name]
+    if not ids:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return names, ids[0]
+
+def percentile(hist, q):
+    total = sum(hist.values())
+    if not total:
+        return None
+    seen = 0
+    for b in sorted(hist):
+        seen += hist[b]
+        if seen >= q * total:
+            return round(bin_midpoint(b), 2)
+
+router = APIRouter(prefix="/analytics")
+
+@router.get("/volume")
+def volume(granularity: str = "day", start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+           group_name: Optional[str] = None, type: Optional[str] = None,
+           user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    start, end = _window(granularity, start, end)
+    names, group_id = _group_lookup(db, group_name)
+    R = AnalyticsRollup
+    rows = db.query(R.bucket_start, R.group_id, func.sum(R.created_count), func.sum(R.closed_count)).filter(
+        *_filters(R, granularity, start, end, group_id, type)).group_by(R.bucket_start, R.group_id).order_by(R.bucket_start).all()
+    return {"granularity": granularity, "series": [
+        {"bucket_start": b, "group": names.get(g), "created": c, "closed": cl} for b, g, c, cl in rows
+    ]}
+
+@router.get("/mttr")
+def mttr(granularity: str = "day", start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+         group_name: Optional[str] = None, type: Optional[str] = None,
+         user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    start, end = _window(granularity, start, end)
+    names, group_id = _group_lookup(db, group_name)
+    R, H = AnalyticsRollup, AnalyticsResolutionHist
+    rows = db.query(R.bucket_start, R.group_id, func.sum(R.closed_count), func.sum(R.resolution_hours_sum)).filter(
+        *_filters(R, granularity, start, end, group_id, type), R.closed_count > 0).group_by(R.bucket_start, R.group_id).order_by(R.bucket_start).all()
+    hists = {}
+    for b, g, bin_, n in db.query(H.bucket_start, H.group_id, H.bin, func.sum(H.count)).filter(
+            *_filters(H, granularity, start, end, group_id, type)).group_by(H.bucket_start, H.group_id, H.bin).all():
+        hists.setdefault((b, g), {})[bin_] = n
+    series = []
+    for b, g, closed, hours in rows:
+        hist = hists.get((b, g), {})
+        series.append({"bucket_start": b, "group": names.get(g), "closed": closed,
+                       "mean_hours": round(hours / closed, 2), "p50_hours": percentile(hist, 0.5), "p90_hours": percentile(hist, 0.9)})
+    return {"granularity": granularity, "series": series}
+
+def main():
+    init_db()
+    frame = None
+    if "--from-export" in sys.argv:
+        from export_data import read_frame
+        frame = read_frame("incidents", columns=["assigned_group_id", "title", "description", "created_at", "closed_at", "first_closed_at"])
+        # Parts exported before first_closed_at existed have only closed_at
+        frame["first_closed_at"] = frame["first_closed_at"].fillna(frame["closed_at"])
+    db = SessionLocal()
+    try:
+        n_rollups, n_hist = backfill(db, frame)
+        print(f"✅ Rebuilt {n_rollups} rollup rows and {n_hist} histogram rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,66 @@
 # app.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-import joblib
+from typing import List, Optional
+import heapq
+import asyncio
+from contextlib import asynccontextmanager
+import os
 import datetime
-import pandas as pd
 
-from db_config import Base, engine, SessionLocal, User, Group, GroupMembership, Incident, IncidentJournal
-
-# Create tables if not exist
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+from db_config import init_db, get_db, SessionLocal, OutboxEvent, User, Group, GroupMembership, Incident, IncidentJournal, ArchivedIncident
+from auth import TokenUser, current_user, current_analyst, issue_token, active_group_ids
+import sla
+import routing
+from routing import infer_type
+import analytics
+import outbox
+import predictor
+import archive
+import drift
+import dedupe
+import leader
+from admission import AdmissionControl
+from responses import (respond, incident_query, incidents_out, incident_out, journal_page, decode_cursor,
+                       MyIncidentsOut, GroupQueueOut, AssignedIncidentsOut, IncidentDetailOut, JournalPageOut, IncidentChangeOut)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes run here rather than at import; set AUTO_MIGRATE=0 when migrate.py runs separately
+    if os.environ.get("AUTO_MIGRATE", "1") == "1":
+        init_db()
+    if os.environ.get("PREDICTOR_PRELOAD", "1") == "1":
+        # Load the model off the event loop so the first prediction doesn't pay for it
+        asyncio.get_running_loop().run_in_executor(None, predictor.load)
+    if os.environ.get("SLA_SCHEDULER_ENABLED", "1") == "1":
+        sla.scheduler.start()
+    if os.environ.get("ARCHIVE_ENABLED", "1") == "1":
+        archive.scheduler.start()
+    if routing.REFRESH_SECONDS > 0:
+        routing.refresher.start()
+    if drift.REFRESH_SECONDS > 0:
+        drift.refresher.start()
+    if dedupe.FLUSH_SECONDS > 0:
+        dedupe.flusher.start()
+    outbox.dispatcher.start()
+    yield
+    await outbox.dispatcher.stop()
+    await dedupe.flusher.stop()
+    dedupe.flush_once()
+    await drift.refresher.stop()
+    await routing.refresher.stop()
+    await archive.scheduler.stop()
+    await sla.scheduler.stop()
+    leader.release()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Added first so CORS wraps it and 429/503 responses still carry CORS headers
+app.add_middleware(AdmissionControl)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # restrict to http://localhost:8501 later
@@ -20,19 +68,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# Load model if available
-try:
-    MODEL = joblib.load("resolution_model.pkl")
-except Exception:
-    MODEL = None
+app.include_router(sla.router)
+app.include_router(analytics.router)
+app.include_router(drift.router)
+app.include_router(dedupe.router)
 
 # Schemas
 class SignUpData(BaseModel):
@@ -48,10 +87,10 @@ class LoginData(BaseModel):
 class IncidentCreate(BaseModel):
     title: str
     description: str
-    group_name: str
+    group_name: Optional[str] = None  # None: route from the inferred type
 
 class AssignIncident(BaseModel):
-    analyst_email: str
+    analyst_email: Optional[str] = None  # defaults to the calling analyst
 
 class UpdateIncident(BaseModel):
     status: str
@@ -63,41 +102,8 @@ class PredictRequest(BaseModel):
     group: str
     type: str
 
-# Utilities
-def serialize_incident(i: Incident):
-    return {
-        "id": i.id,
-        "title": i.title,
-        "description": i.description,
-        "status": i.status,
-        "requester_id": i.requester_id,
-        "assigned_group_id": i.assigned_group_id,
-        "assigned_to_user_id": i.assigned_to_user_id,
-        "created_at": i.created_at,
-        "updated_at": i.updated_at,
-        "closed_at": i.closed_at,
-        "group": i.assigned_group.name if i.assigned_group else None,
-        "assigned_to": i.assigned_to.email if i.assigned_to else None,
-    }
-
-def serialize_journal(j: IncidentJournal):
-    return {
-        "id": j.id,
-        "author": j.author.email,
-        "comment": j.comment,
-        "status": j.status,
-        "created_at": j.created_at,
-    }
-
-def infer_type(title, description):
-    text = f"{title} {description}".lower()
-    if "network" in text or "vpn" in text or "wifi" in text:
-        return "Network"
-    if "server" in text or "database" in text or "db" in text:
-        return "Infra"
-    if "bug" in text or "error" in text or "ui" in text or "app" in text:
-        return "Software"
-    return "General"
+class PredictBatchRequest(BaseModel):
+    items: List[PredictRequest]
 
 # Auth
 @app.post("/signup")
@@ -113,11 +119,12 @@ def login(data: LoginData, db: Session = Depends(get_db)):
     u = db.query(User).filter(User.email == data.email).first()
     if not u or u.password != data.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful", "user": u.username, "role": u.role}
+    token = issue_token(u, active_group_ids(db, u.id))
+    return {"message": "Login successful", "user": u.username, "role": u.role, "access_token": token, "token_type": "bearer"}
 
 # Groups
 @app.post("/groups/create")
-def create_group(name: str, db: Session = Depends(get_db)):
+def create_group(name: str, user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
     g = db.query(Group).filter(Group.name == name).first()
     if g:
         return {"message": "Group already exists", "group_id": g.id}
@@ -125,8 +132,9 @@ def create_group(name: str, db: Session = Depends(get_db)):
     return {"message": "Group created", "group_id": g.id}
 
 @app.post("/groups/add_analyst")
-def add_analyst_to_group(analyst_email: str, group_name: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == analyst_email, User.role == "analyst").first()
+def add_analyst_to_group(group_name: str, analyst_email: Optional[str] = None,
+                         caller: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.email == (analyst_email or caller.email), User.role == "analyst").first()
     if not user:
         raise HTTPException(status_code=404, detail="Analyst not found or not an analyst")
     group = db.query(Group).filter(Group.name == group_name).first()
@@ -135,74 +143,117 @@ def add_analyst_to_group(analyst_email: str, group_name: str, db: Session = Depe
     if db.query(GroupMembership).filter_by(user_id=user.id, group_id=group.id).first():
         return {"message": "Analyst already in group"}
     m = GroupMembership(user_id=user.id, group_id=group.id); db.add(m); db.commit()
-    return {"message": "Analyst added to group"}
+    routing.TRACKER.add_member(group.id, user.id, user.email)
+    res = {"message": "Analyst added to group"}
+    if user.id == caller.id:
+        # Memberships travel inside the token, so hand the caller a fresh one
+        res["access_token"] = issue_token(user, active_group_ids(db, user.id))
+    return res
 
 # Incidents
 @app.post("/incidents")
-def create_incident(data: IncidentCreate, requester_email: str, db: Session = Depends(get_db)):
-    requester = db.query(User).filter(User.email == requester_email).first()
-    if not requester:
-        raise HTTPException(status_code=404, detail="Requester not found")
-    group = db.query(Group).filter(Group.name == data.group_name).first()
+def create_incident(data: IncidentCreate, requester: TokenUser = Depends(current_user), db: Session = Depends(get_db),
+                    idempotency_key: Optional[str] = Header(None, max_length=dedupe.MAX_KEY_LENGTH)):
+    ptype = infer_type(data.title, data.description)
+    if data.group_name:
+        group = db.query(Group).filter(Group.name == data.group_name).first()
+    else:
+        group = routing.route_group(db, ptype)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
 
+    # Retries and repeat filings get the existing incident back: no writes, no prediction
     now = datetime.datetime.now(datetime.timezone.utc)
+    fp = dedupe.fingerprint(requester.id, group.id, data.title, data.description)
+    dup = dedupe.find_duplicate(db, requester.id, idempotency_key, fp, now)
+    if dup:
+        return duplicate_response(db, *dup)
+
+    # Auto-assign to the least-loaded analyst of the group, if anyone has joined it
+    routing.TRACKER.warm(db)
+    pick = routing.TRACKER.pick(group.id) if routing.AUTO_ASSIGN else None
+
     inc = Incident(
-        title=data.title, description=data.description, status="open",
+        title=data.title, description=data.description, status="assigned" if pick else "open",
         requester_id=requester.id, assigned_group_id=group.id,
-        assigned_to_user_id=None, created_at=now, updated_at=now
+        assigned_to_user_id=pick[0] if pick else None, created_at=now, updated_at=now,
+        idempotency_key=idempotency_key, fingerprint=fp
     )
-    db.add(inc); db.commit(); db.refresh(inc)
-
-    # Optional: immediate prediction and store in journal for user visibility
-    predicted_hours = None
-    if MODEL:
-        ptype = infer_type(inc.title, inc.description)
-        X = [{"title": inc.title, "description": inc.description, "group": group.name, "type": ptype}]
-        try:
-            predicted_hours = float(MODEL.predict(X)[0])
-            j = IncidentJournal(
-                incident_id=inc.id, author_user_id=requester.id,
-                comment=f"Projected resolution: {predicted_hours:.1f} hours", status="open",
-                created_at=now
-            )
-            db.add(j); db.commit()
-        except Exception:
-            pass
-
-    return {"message": "Incident created", "incident": serialize_incident(inc), "predicted_hours": predicted_hours}
-
-@app.get("/incidents/my")
-def my_incidents(email: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    incs = db.query(Incident).filter(Incident.requester_id == user.id).order_by(Incident.id.desc()).all()
-    return {"incidents": [serialize_incident(i) for i in incs]}
-
-@app.get("/incidents/group_queue")
-def group_queue(group_name: str, db: Session = Depends(get_db)):
+    if pick:
+        inc.journals.append(IncidentJournal(
+            author_user_id=pick[0], comment=f"Auto-assigned to {pick[1]}", status="assigned", created_at=now
+        ))
+    try:
+        db.add(inc); db.flush()
+        analytics.record_created(db, group.id, ptype, now)
+        # Prediction and the "Projected resolution" journal happen in the outbox workers
+        ev = outbox.event("predict", incident_id=inc.id, type=ptype)
+        db.add(ev); db.flush()
+        inc_id, ev_id = inc.id, ev.id
+        db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key committed first
+        db.rollback()
+        if pick:
+            routing.TRACKER.unreserve(pick[0])
+        dup = dedupe.find_duplicate(db, requester.id, idempotency_key, fp, now) if idempotency_key else None
+        if not dup:
+            raise
+        return duplicate_response(db, *dup)
+    except Exception:
+        if pick:
+            routing.TRACKER.unreserve(pick[0])
+        raise
+    dedupe.STATS.record(None)
+    outbox.dispatcher.notify(ev_id)
+    if pick:
+        routing.TRACKER.assign(inc_id, pick[0], reserved=True)
+
+    return respond({"message": "Incident created", "incident": incident_out(db, inc_id), "predicted_hours": None,
+                    "prediction_pending": True, "duplicate_of": None})
+
+def duplicate_response(db, incident_id, matched_on):
+    dedupe.STATS.record(matched_on)
+    inc = incident_out(db, incident_id)
+    return respond({"message": f"Duplicate of incident #{incident_id}", "incident": inc, "predicted_hours": inc.predicted_hours,
+                    "prediction_pending": inc.predicted_hours is None, "duplicate_of": incident_id, "matched_on": matched_on})
+
+@app.get("/incidents/my", response_model=MyIncidentsOut)
+def my_incidents(user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    rows = incident_query(db).filter(Incident.requester_id == user.id).order_by(Incident.id.desc()).all()
+    cold = incident_query(db, archived=True).filter(ArchivedIncident.c.requester_id == user.id).order_by(ArchivedIncident.c.id.desc()).all()
+    if cold:
+        rows = list(heapq.merge(rows, cold, key=lambda r: r[0], reverse=True))
+    return respond(MyIncidentsOut(incidents_out(rows)))
+
+@app.get("/incidents/group_queue", response_model=GroupQueueOut)
+def group_queue(group_name: str, user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
     group = db.query(Group).filter(Group.name == group_name).first()
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
-    incs = db.query(Incident).filter(
+    rows = incident_query(db).filter(
         Incident.assigned_group_id == group.id,
         Incident.assigned_to_user_id.is_(None),
         Incident.status == "open"
     ).order_by(Incident.id.asc()).all()
-    return {"open_incidents": [serialize_incident(i) for i in incs]}
-
-@app.post("/incidents/{incident_id}/assign")
-def assign_incident(incident_id: int, data: AssignIncident, db: Session = Depends(get_db)):
-    analyst = db.query(User).filter(User.email == data.analyst_email, User.role == "analyst").first()
-    if not analyst:
-        raise HTTPException(status_code=404, detail="Analyst not found or not an analyst")
+    return respond(GroupQueueOut(incidents_out(rows)))
+
+@app.post("/incidents/{incident_id}/assign", response_model=IncidentChangeOut)
+def assign_incident(incident_id: int, data: AssignIncident, caller: TokenUser = Depends(current_analyst), db: Session = Depends(get_db)):
+    if data.analyst_email in (None, caller.email):
+        analyst = caller
+    else:
+        analyst = db.query(User).filter(User.email == data.analyst_email, User.role == "analyst").first()
+        if not analyst:
+            raise HTTPException(status_code=404, detail="Analyst not found or not an analyst")
     inc = db.query(Incident).filter(Incident.id == incident_id).first()
     if not inc:
         raise HTTPException(status_code=404, detail="Incident not found")
-    membership = db.query(GroupMembership).filter_by(user_id=analyst.id, group_id=inc.assigned_group_id, is_active=True).first()
-    if not membership:
+    if analyst is caller:
+        is_member = inc.assigned_group_id in caller.groups
+    else:
+        is_member = db.query(GroupMembership).filter_by(user_id=analyst.id, group_id=inc.assigned_group_id, is_active=True).first() is not None
+    if not is_member:
         raise HTTPException(status_code=403, detail="Analyst not a member of group")
 
     inc.assigned_to_user_id = analyst.id
@@ -215,22 +266,16 @@ def assign_incident(incident_id: int, data: AssignIncident, db: Session = Depend
         created_at=datetime.datetime.now(datetime.timezone.utc)
     )
     db.add(j); db.commit(); db.refresh(inc)
-    return {"message": "Incident assigned", "incident": serialize_incident(inc)}
-
-@app.get("/incidents/assigned")
-def assigned_incidents(email: str, db: Session = Depends(get_db)):
-    analyst = db.query(User).filter(User.email == email, User.role == "analyst").first()
-    if not analyst:
-        raise HTTPException(status_code=404, detail="Analyst not found or not an analyst")
+    routing.TRACKER.assign(inc.id, analyst.id, inc.predicted_hours)
+    return respond(IncidentChangeOut("Incident assigned", incident_out(db, inc.id)))
 
-    incs = db.query(Incident).filter(Incident.assigned_to_user_id == analyst.id).order_by(Incident.id.desc()).all()
-    return {"assigned_incidents": [serialize_incident(i) for i in incs]}
+@app.get("/incidents/assigned", response_model=AssignedIncidentsOut)
+def assigned_incidents(analyst: TokenUser = Depends(current_analyst), db: Session = Depends(get_db)):
+    rows = incident_query(db).filter(Incident.assigned_to_user_id == analyst.id).order_by(Incident.id.desc()).all()
+    return respond(AssignedIncidentsOut(incidents_out(rows)))
 
-@app.post("/incidents/{incident_id}/update")
-def update_incident(incident_id: int, data: UpdateIncident, author_email: str, db: Session = Depends(get_db)):
-    author = db.query(User).filter(User.email == author_email).first()
-    if not author:
-        raise HTTPException(status_code=404, detail="Author not found")
+@app.post("/incidents/{incident_id}/update", response_model=IncidentChangeOut)
+def update_incident(incident_id: int, data: UpdateIncident, author: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
     inc = db.query(Incident).filter(Incident.id == incident_id).first()
     if not inc:
         raise HTTPException(status_code=404, detail="Incident not found")
@@ -240,54 +285,137 @@ def update_incident(incident_id: int, data: UpdateIncident, author_email: str, d
         raise HTTPException(status_code=400, detail=f"Invalid status. Allowed: {sorted(list(valid))}")
 
     now = datetime.datetime.now(datetime.timezone.utc)
+    # closed_at follows the latest close (archival and training read it); the rollups and the
+    # drift monitor count each incident once, at first_closed_at, like a backfill does
+    first_close = data.status == "closed" and inc.first_closed_at is None
+    if first_close:
+        ptype = infer_type(inc.title, inc.description)
+        analytics.record_closed(db, inc.assigned_group_id, ptype, inc.created_at, now)
+        inc.first_closed_at = now
+    inc.closed_at = now if data.status == "closed" else None
     inc.status = data.status
     inc.updated_at = now
-    if data.status == "closed":
-        inc.closed_at = now
 
     j = IncidentJournal(incident_id=inc.id, author_user_id=author.id, comment=data.comment, status=data.status, created_at=now)
     db.add(j); db.add(inc); db.commit(); db.refresh(inc)
-    return {"message": "Incident updated", "incident": serialize_incident(inc)}
-
-@app.get("/incident/{incident_id}")
-def get_incident(incident_id: int, db: Session = Depends(get_db)):
-    inc = db.query(Incident).filter(Incident.id == incident_id).first()
+    if first_close and inc.predicted_hours is not None:
+        # Record before warming: a cold monitor skips it here and reads it back in warm()
+        drift.MONITOR.record_close(inc.assigned_group_id, ptype, inc.predicted_hours, inc.created_at, inc.first_closed_at)
+        drift.MONITOR.warm(db)
+    if inc.status in sla.OPEN_STATUSES and inc.assigned_to_user_id:
+        routing.TRACKER.assign(inc.id, inc.assigned_to_user_id, inc.predicted_hours)
+    else:
+        routing.TRACKER.release(inc.id)
+    return respond(IncidentChangeOut("Incident updated", incident_out(db, inc.id)))
+
+JOURNAL_PAGE_SIZE = 100
+MAX_JOURNAL_PAGE_SIZE = 500
+
+def check_journal_limit(limit, lowest=1):
+    if not lowest <= limit <= MAX_JOURNAL_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between {lowest} and {MAX_JOURNAL_PAGE_SIZE}")
+
+def is_archived(db, incident_id):
+    """False for a live incident, True for an archived one; 404 if neither."""
+    if db.query(Incident.id).filter(Incident.id == incident_id).first():
+        return False
+    if db.query(ArchivedIncident.c.id).filter(ArchivedIncident.c.id == incident_id).first():
+        return True
+    raise HTTPException(status_code=404, detail="Incident not found")
+
+# Incident plus the first page of its journals; the rest via /incident/{id}/journals
+@app.get("/incident/{incident_id}", response_model=IncidentDetailOut)
+def get_incident(incident_id: int, journal_limit: int = JOURNAL_PAGE_SIZE, user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    check_journal_limit(journal_limit, lowest=0)
+    inc = incident_out(db, incident_id)
+    archived = inc is None
+    if archived:
+        inc = incident_out(db, incident_id, archived=True)
     if not inc:
         raise HTTPException(status_code=404, detail="Incident not found")
-    journals = db.query(IncidentJournal).filter(IncidentJournal.incident_id == inc.id).order_by(IncidentJournal.created_at.asc()).all()
-    return {"incident": serialize_incident(inc), "journals": [serialize_journal(j) for j in journals]}
-
-# Prediction endpoint (usable by Streamlit)
-@app.post("/predict_resolution_time")
-def predict_resolution(req: PredictRequest):
-    if MODEL is None:
+    journals, next_cursor = journal_page(db, incident_id, archived, limit=journal_limit) if journal_limit else ([], None)
+    return respond(IncidentDetailOut(inc, journals, next_cursor))
+
+@app.get("/incident/{incident_id}/journals", response_model=JournalPageOut)
+def get_incident_journals(incident_id: int, limit: int = JOURNAL_PAGE_SIZE, cursor: Optional[str] = None, since: Optional[int] = None,
+                          order: str = "asc", user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    check_journal_limit(limit)
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    archived = is_archived(db, incident_id)
+    journals, next_cursor = journal_page(db, incident_id, archived, limit=limit, after=after, since=since,
+                                         newest_first=order == "desc")
+    return respond(JournalPageOut(journals, next_cursor))
+
+# Prediction endpoints (usable by Streamlit). intervals=true adds p10/p50/p90 from the spread of the forest's trees.
+MAX_PREDICT_BATCH = 1000
+
+def predict_many(items, intervals):
+    if predictor.get_model() is None:
         raise HTTPException(status_code=503, detail="Model not loaded. Train it first.")
-    X = pd.DataFrame([{"title": req.title, "description": req.description, "group": req.group, "type": req.type}])
+    rows = [{"title": r.title, "description": r.description, "group": r.group, "type": r.type} for r in items]
     try:
-        y = float(MODEL.predict(X)[0])
-        return {"predicted_resolution_hours": y}
+        if not intervals:
+            return [{"predicted_resolution_hours": y} for y in predictor.predict_hours(rows)]
+        return [{"predicted_resolution_hours": p.pop("hours"), "interval_hours": p} for p in predictor.predict_intervals(rows)]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
 
+@app.post("/predict_resolution_time")
+def predict_resolution(req: PredictRequest, intervals: bool = False):
+    return predict_many([req], intervals)[0]
+
+@app.post("/predict_resolution_time/batch")
+def predict_resolution_batch(req: PredictBatchRequest, intervals: bool = False):
+    if not 1 <= len(req.items) <= MAX_PREDICT_BATCH:
+        raise HTTPException(status_code=400, detail=f"items must hold between 1 and {MAX_PREDICT_BATCH} incidents")
+    return {"predictions": predict_many(req.items, intervals)}
+
+
+# Health: /healthz only says the process serves requests (restart it if not); /readyz says
+# whether to route traffic to it
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/readyz")
+def readyz():
+    checks = {"pid": os.getpid(), "leader": leader.is_leader(), "model": predictor.status()}
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        pending = db.query(OutboxEvent.id).filter(OutboxEvent.processed_at.is_(None)).count()
+        checks["database"] = {"ok": True, "outbox_pending": pending}
+    except Exception as e:
+        checks["database"] = {"ok": False, "error": str(e)[:200]}
+    finally:
+        db.close()
+    # With PREDICTOR_PRELOAD the first load must have finished (a missing pickle still counts: predictions are skipped)
+    model_ready = checks["model"]["load_attempted"] or os.environ.get("PREDICTOR_PRELOAD", "1") != "1"
+    ready = checks["database"]["ok"] and model_ready
+    return respond({"status": "ready" if ready else "not ready", **checks}, status_code=200 if ready else 503)
 
 # Utility: get user stats for dashboard card
 @app.get("/dashboard_stats")
-def dashboard_stats(email: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+def dashboard_stats(user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
     my_incs = db.query(Incident).filter(Incident.requester_id == user.id).all()
     open_count = sum(1 for i in my_incs if i.status != "closed")
     latest = my_incs[-1] if my_incs else None
-    proj_hours = None
-    if latest and MODEL:
+    proj_hours = latest.predicted_hours if latest else None
+    if latest and proj_hours is None and predictor.get_model() is not None:
+        # Incidents from before predictions were stored on the row
         ptype = infer_type(latest.title, latest.description)
         try:
-            proj_hours = float(MODEL.predict([{
+            proj_hours = predictor.predict_hours([{
                 "title": latest.title, "description": latest.description,
                 "group": latest.assigned_group.name if latest.assigned_group else "Unknown",
                 "type": ptype
-            }])[0])
+            }])[0]
         except Exception:
             proj_hours = None
     return {"open_incidents": open_count, "latest_projected_hours": proj_hours}
@@ -0,0 +1,57 @@
+# archive.py
+# Moves incidents closed for longer than ARCHIVE_AFTER_DAYS, with their journals, into
+# the attached archive database in small batches, so the hot tables scanned by the
+# queue/dashboard endpoints only hold live work. Archived incidents are read-only.
+import os
+import datetime
+
+from sqlalchemy import select, insert, delete
+
+from db_config import (SessionLocal, Incident, IncidentJournal, SlaBreach, OutboxEvent,
+                       ArchivedIncident, ArchivedJournal, ARCHIVE_DATABASE_PATH)
+from jobs import PeriodicTask
+import leader
+
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", 30))
+BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 500))
+MAX_BATCHES_PER_RUN = int(os.environ.get("ARCHIVE_MAX_BATCHES_PER_RUN", 20))
+INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+def _copy(db, source, target, where):
+    names = [c.name for c in target.columns]
+    db.execute(insert(target).from_select(names, select(*[source.c[n] for n in names]).where(where)))
+
+def archive_batch(db, cutoff, batch_size=BATCH_SIZE):
+    """Move one batch in a single transaction. Returns the number of incidents moved."""
+    ids = [r[0] for r in db.query(Incident.id).filter(Incident.status == "closed", Incident.closed_at < cutoff).order_by(
+        Incident.closed_at).limit(batch_size).all()]
+    if not ids:
+        return 0
+    _copy(db, Incident.__table__, ArchivedIncident, Incident.id.in_(ids))
+    _copy(db, IncidentJournal.__table__, ArchivedJournal, IncidentJournal.incident_id.in_(ids))
+    db.execute(delete(IncidentJournal).where(IncidentJournal.incident_id.in_(ids)))
+    db.execute(delete(SlaBreach).where(SlaBreach.incident_id.in_(ids)))
+    db.execute(delete(OutboxEvent).where(OutboxEvent.incident_id.in_(ids), OutboxEvent.processed_at.isnot(None)))
+    db.execute(delete(Incident).where(Incident.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+def run_once(now=None, max_batches=MAX_BATCHES_PER_RUN):
+    if not ARCHIVE_DATABASE_PATH or not leader.is_leader():
+        return 0
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = now - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)
+    moved = 0
+    for _ in range(max_batches):
+        # Fresh session per batch keeps each write transaction short
+        db = SessionLocal()
+        try:
+            n = archive_batch(db, cutoff)
+        finally:
+            db.close()
+        moved += n
+        if n < BATCH_SIZE:
+            break
+    return moved
+
+scheduler = PeriodicTask("Archival", run_once, INTERVAL_SECONDS)
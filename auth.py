@@ -0,0 +1,77 @@
+# auth.py
+import os
+import json
+import time
+import hmac
+import base64
+import hashlib
+import secrets
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel
+
+from db_config import GroupMembership
+
+# Set INCIDENT_APP_SECRET in production; the random fallback invalidates tokens on every restart
+SECRET = os.environ.get("INCIDENT_APP_SECRET") or secrets.token_urlsafe(32)
+TOKEN_TTL_SECONDS = int(os.environ.get("TOKEN_TTL_SECONDS", 8 * 3600))
+
+bearer = HTTPBearer(auto_error=False)
+
+class TokenUser(BaseModel):
+    id: int
+    username: str
+    email: str
+    role: str
+    groups: List[int] = []
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(SECRET.encode(), body.encode("ascii"), hashlib.sha256).digest())
+
+def issue_token(user, group_ids) -> str:
+    """Sign a stateless token carrying everything endpoints need to know about the caller."""
+    payload = {
+        "uid": user.id, "name": user.username, "email": user.email, "role": user.role or "user",
+        "groups": sorted(group_ids), "exp": int(time.time()) + TOKEN_TTL_SECONDS,
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body)}"
+
+def decode_token(token: str) -> Optional[TokenUser]:
+    try:
+        body, sig = token.split(".", 1)
+        if not hmac.compare_digest(sig, _sign(body)):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError):  # UnicodeError is a ValueError: non-ASCII bytes in a forged token
+        return None
+    if payload.get("exp", 0) < time.time():
+        return None
+    return TokenUser(id=payload["uid"], username=payload["name"], email=payload["email"],
+                     role=payload["role"], groups=payload.get("groups", []))
+
+def active_group_ids(db, user_id):
+    rows = db.query(GroupMembership.group_id).filter_by(user_id=user_id, is_active=True).all()
+    return [r[0] for r in rows]
+
+# Dependencies
+def current_user(creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> TokenUser:
+    if creds is None:
+        raise HTTPException(status_code=401, detail="Missing bearer token", headers={"WWW-Authenticate": "Bearer"})
+    user = decode_token(creds.credentials)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+def current_analyst(user: TokenUser = Depends(current_user)) -> TokenUser:
+    if user.role != "analyst":
+        raise HTTPException(status_code=403, detail="Analyst role required")
+    return user
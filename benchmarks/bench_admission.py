@@ -0,0 +1,143 @@
+# benchmarks/bench_admission.py
+# Burst load against a real uvicorn server: analysts keep updating tickets while new
+# incidents and dashboard polls arrive (open loop, Poisson) at several times what the
+# server can write, with admission control off and on. The burst comes from a separate
+# process so client-side scheduling doesn't show up in the analyst latencies.
+#   python -m benchmarks.bench_admission
+import os
+import sys
+import time
+import random
+import shutil
+import socket
+import asyncio
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.common import use_temp_database, seed
+
+ANALYSTS = 8
+SUBMIT_PER_SECOND = 150
+POLL_PER_SECOND = 50
+QUIET_SECONDS = 5
+BURST_SECONDS = 20
+SECRET = "bench-admission-secret"
+
+def prepare_template():
+    path = use_temp_database("admission")
+    from db_config import SessionLocal, init_db, engine
+    init_db()
+    db = SessionLocal()
+    seed(db, 5_000, closed_ratio=0.2)
+    db.close()
+    engine.dispose()
+    return path
+
+def start_server(template, admission):
+    workdir = tempfile.mkdtemp(prefix="incident_admission_run_")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copy(template, db_path)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "INCIDENT_APP_SECRET": SECRET,
+           "ADMISSION_ENABLED": "1" if admission else "0", "SLA_SCHEDULER_ENABLED": "0", "ARCHIVE_ENABLED": "0"}
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"], env=env)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(f"{url}/openapi.json", timeout=1)
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    return proc, url
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(p * len(values)), len(values) - 1)] if values else float("nan")
+
+async def login(client, email):
+    r = await client.post("/login", json={"email": email, "password": "pw"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+# Burst side (runs in its own process)
+async def burst(url, seconds):
+    stats = {}
+    rng = random.Random(1)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=httpx.Limits(max_connections=None)) as client:
+        headers = [await login(client, f"user{i}@example.com") for i in range(50)]
+        submit = lambda h: client.post("/incidents", json={"title": "outage", "description": "vpn and email down for the whole floor"}, headers=h)
+        poll = lambda h: client.get("/incidents/my", headers=h)
+
+        async def one(kind, call):
+            t0 = time.perf_counter()
+            try:
+                code = (await call(rng.choice(headers))).status_code
+            except httpx.HTTPError:
+                code = "conn"
+            stats.setdefault((kind, str(code)), []).append((time.perf_counter() - t0) * 1000)
+
+        async def arrivals(kind, call, rate):
+            # Open loop: each arrival is a new user, nobody waits for the previous one
+            tasks, deadline = [], time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                tasks.append(asyncio.create_task(one(kind, call)))
+                await asyncio.sleep(rng.expovariate(rate))
+            await asyncio.gather(*tasks)
+
+        await asyncio.gather(arrivals("submit", submit, SUBMIT_PER_SECOND), arrivals("dashboard", poll, POLL_PER_SECOND))
+    for (kind, code), lat in sorted(stats.items()):
+        print(f"  {kind:<10} {code:>4} {len(lat):>7} {percentile(lat, 0.5):>9.0f} {percentile(lat, 0.99):>9.0f}")
+
+# Analyst side
+async def analysts(url, seconds, results):
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        ids = [r["id"] for r in (await client.get("/incidents/assigned", headers=await login(client, "analyst0@example.com"))).json()["assigned_incidents"]]
+        headers = [await login(client, f"analyst{i}@example.com") for i in range(ANALYSTS)]
+        deadline = time.perf_counter() + seconds
+
+        async def loop(i):
+            n = i
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.post(f"/incidents/{ids[n % len(ids)]}/update", json={"status": "in-progress", "comment": "working on it"},
+                                      headers=headers[i])
+                results.append(((time.perf_counter() - t0) * 1000, r.status_code))
+                n += ANALYSTS
+                await asyncio.sleep(0.05)
+        await asyncio.gather(*[loop(i) for i in range(ANALYSTS)])
+
+def run_mode(template, admission):
+    proc, url = start_server(template, admission)
+    try:
+        quiet = []
+        asyncio.run(analysts(url, QUIET_SECONDS, quiet))
+        print(f"\nadmission {'on' if admission else 'off'}: {SUBMIT_PER_SECOND} new incidents/s + {POLL_PER_SECOND} dashboard polls/s for {BURST_SECONDS}s")
+        print(f"  {'class':<10} {'code':>4} {'requests':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        load = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_admission", "--burst", url, str(BURST_SECONDS)])
+        time.sleep(2)  # let the burst build up
+        loaded = []
+        asyncio.run(analysts(url, BURST_SECONDS - 4, loaded))
+        load.wait()
+        for name, rows in (("quiet", quiet), ("burst", loaded)):
+            lat = [ms for ms, code in rows if code == 200]
+            errors = sum(code != 200 for _, code in rows)
+            print(f"  analyst updates, {name}: {len(lat)} ok, {errors} failed, p50 {percentile(lat, 0.5):.0f}ms, p99 {percentile(lat, 0.99):.0f}ms")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    if "--burst" in sys.argv:
+        i = sys.argv.index("--burst")
+        asyncio.run(burst(sys.argv[i + 1], float(sys.argv[i + 2])))
+        return
+    os.environ["INCIDENT_APP_SECRET"] = SECRET
+    template = prepare_template()
+    for admission in (False, True):
+        run_mode(template, admission)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_analytics.py
+# /analytics/* latency as the incident table grows, against an ad hoc scan of
+# the incidents table answering the same MTTR-by-group-by-day question.
+#   python -m benchmarks.bench_analytics
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("analytics")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func
+
+from db_config import SessionLocal, init_db, User, Group, GroupMembership, Incident
+import analytics
+from api import app
+
+SIZES = [10_000, 100_000, 300_000]
+
+def adhoc_mttr(db):
+    day = func.date(Incident.closed_at)
+    hours = (func.julianday(Incident.closed_at) - func.julianday(Incident.created_at)) * 24
+    return db.query(day, Incident.assigned_group_id, func.count(), func.avg(hours)).filter(
+        Incident.closed_at.isnot(None)).group_by(day, Incident.assigned_group_id).all()
+
+def main():
+    init_db()
+    client = TestClient(app)
+    print(f"{'incidents':>10} {'backfill':>10} {'rollup rows':>12} {'/mttr':>8} {'/volume':>8} {'ad hoc scan':>12}")
+    for size in SIZES:
+        db = SessionLocal()
+        for model in (Incident, GroupMembership, Group, User):
+            db.execute(delete(model))
+        db.commit()
+        seed(db, size, seed=size)
+        backfill_ms = timeit(lambda: analytics.backfill(db), repeat=1)
+        n_rollups = db.query(analytics.AnalyticsRollup).count()
+        token = client.post("/login", json={"email": "user0@example.com", "password": "pw"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+        params = {"granularity": "day", "start": "2000-01-01T00:00:00"}
+        mttr_ms = timeit(lambda: client.get("/analytics/mttr", params=params, headers=h).raise_for_status(), repeat=20)
+        volume_ms = timeit(lambda: client.get("/analytics/volume", params=params, headers=h).raise_for_status(), repeat=20)
+        adhoc_ms = timeit(lambda: adhoc_mttr(db))
+        print(f"{size:>10} {backfill_ms:>8.0f}ms {n_rollups:>12} {mttr_ms:>6.1f}ms {volume_ms:>6.1f}ms {adhoc_ms:>10.1f}ms")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_archive.py
+# Archival throughput, hot-table endpoint latency before/after moving long-closed
+# incidents to archive.db, and GET /incident/{id} for a hot vs an archived incident.
+#   python -m benchmarks.bench_archive
+import time
+
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("archive")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from db_config import SessionLocal, init_db, Incident, IncidentJournal, ArchivedIncident
+import archive
+from api import app
+
+N_INCIDENTS = 200_000
+JOURNALS_PER_CLOSED = 2
+
+def add_journals(db):
+    rows = db.query(Incident.id, Incident.requester_id, Incident.closed_at).filter(Incident.closed_at.isnot(None)).all()
+    db.bulk_insert_mappings(IncidentJournal, [
+        {"incident_id": r.id, "author_user_id": r.requester_id, "status": "closed", "comment": f"note {k}", "created_at": r.closed_at}
+        for r in rows for k in range(JOURNALS_PER_CLOSED)
+    ])
+    db.commit()
+
+def endpoint_timings(client, user_h, analyst_h):
+    return {
+        "/incidents/my": timeit(lambda: client.get("/incidents/my", headers=user_h).raise_for_status()),
+        "/incidents/assigned": timeit(lambda: client.get("/incidents/assigned", headers=analyst_h).raise_for_status()),
+        "/incidents/group_queue": timeit(lambda: client.get("/incidents/group_queue", params={"group_name": "Support"},
+                                                            headers=analyst_h).raise_for_status()),
+        "/dashboard_stats": timeit(lambda: client.get("/dashboard_stats", headers=analyst_h).raise_for_status()),
+    }
+
+def main():
+    init_db()
+    db = SessionLocal()
+    seed(db, N_INCIDENTS, closed_ratio=0.8)
+    add_journals(db)
+    hot_before = db.query(func.count(Incident.id)).scalar()
+    db.close()
+
+    client = TestClient(app)
+    login = lambda email: {"Authorization": "Bearer " + client.post(
+        "/login", json={"email": email, "password": "pw"}).json()["access_token"]}
+    user_h, analyst_h = login("user0@example.com"), login("analyst0@example.com")
+    before = endpoint_timings(client, user_h, analyst_h)
+
+    t0 = time.perf_counter()
+    moved = archive.run_once(max_batches=10**6)
+    elapsed = time.perf_counter() - t0
+    print(f"archived {moved} of {hot_before} incidents (+{moved * JOURNALS_PER_CLOSED} journals) "
+          f"in {elapsed:.2f}s: {moved / elapsed:,.0f} incidents/s, batch size {archive.BATCH_SIZE}\n")
+
+    after = endpoint_timings(client, user_h, analyst_h)
+    print(f"{'endpoint':<24} {'before ms':>10} {'after ms':>10}")
+    for name in before:
+        print(f"{name:<24} {before[name]:>10.1f} {after[name]:>10.1f}")
+
+    db = SessionLocal()
+    hot_id = db.query(func.max(Incident.id)).scalar()
+    cold_id = db.query(func.max(ArchivedIncident.c.id)).scalar()
+    db.close()
+    hot_ms = timeit(lambda: client.get(f"/incident/{hot_id}", headers=analyst_h).raise_for_status())
+    cold_ms = timeit(lambda: client.get(f"/incident/{cold_id}", headers=analyst_h).raise_for_status())
+    print(f"\nGET /incident/{{id}}: hot {hot_ms:.2f}ms, archived {cold_ms:.2f}ms")
+
+if __name__ == "__main__":
+    main()
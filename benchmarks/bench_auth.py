@@ -0,0 +1,61 @@
+# benchmarks/bench_auth.py
+# SQL statements issued per dashboard render with token auth, versus the
+# one-users-lookup-per-endpoint the email query params used to cost.
+#   python -m benchmarks.bench_auth
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("auth")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from db_config import SessionLocal, init_db, engine, User
+from auth import decode_token
+from api import app
+
+DASHBOARDS = {
+    "user": [("GET", "/dashboard_stats", {}), ("GET", "/incidents/my", {})],
+    "analyst": [("GET", "/incidents/group_queue", {"group_name": "Support"}), ("GET", "/incidents/assigned", {})],
+}
+
+statements = []
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+def is_identity_lookup(sql):
+    return "FROM users" in sql and "WHERE users.email" in sql
+
+def render(client, token, calls):
+    headers = {"Authorization": f"Bearer {token}"}
+    for method, path, params in calls:
+        r = client.request(method, path, params=params, headers=headers)
+        assert r.status_code == 200, (path, r.text)
+
+def main():
+    init_db()
+    db = SessionLocal()
+    seed(db, 2000)
+    db.close()
+
+    client = TestClient(app)
+    print(f"{'dashboard':<10} {'endpoints':>9} {'legacy lookups':>15} {'token lookups':>14} {'total queries':>14}")
+    tokens = {}
+    for role, email in [("user", "user0@example.com"), ("analyst", "analyst0@example.com")]:
+        tokens[role] = client.post("/login", json={"email": email, "password": "pw"}).json()["access_token"]
+        render(client, tokens[role], DASHBOARDS[role])  # warm up
+        statements.clear()
+        render(client, tokens[role], DASHBOARDS[role])
+        lookups = sum(1 for s in statements if is_identity_lookup(s))
+        calls = len(DASHBOARDS[role])
+        print(f"{role:<10} {calls:>9} {calls:>15} {lookups:>14} {len(statements):>14}")
+
+    db = SessionLocal()
+    lookup_ms = timeit(lambda: [db.query(User).filter(User.email == "user0@example.com").first() for _ in range(1000)])
+    db.close()
+    decode_ms = timeit(lambda: [decode_token(tokens["user"]) for _ in range(1000)])
+    print(f"\nper-request identity cost: users lookup {lookup_ms:.3f} us, token decode {decode_ms:.3f} us")
+
+if __name__ == "__main__":
+    main()
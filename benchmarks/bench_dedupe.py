@@ -0,0 +1,97 @@
+# benchmarks/bench_dedupe.py
+# An outage storm against POST /incidents: requesters file the same report over and over,
+# some with client retries carrying an Idempotency-Key. Compares fresh creates with
+# short-circuited duplicates, counts the rows and outbox events that were not written,
+# and times the duplicate lookup with and without its indexes on a large table.
+#   python -m benchmarks.bench_dedupe
+import os
+import time
+import random
+import datetime
+import statistics
+
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("dedupe")
+os.environ["ARCHIVE_ENABLED"] = "0"
+os.environ["SLA_SCHEDULER_ENABLED"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from db_config import SessionLocal, engine, init_db, Incident, OutboxEvent
+import api
+import dedupe
+
+N_INCIDENTS = 100_000
+N_REQUESTS = 1_000
+REPORTERS = 20
+OUTAGES = [("Email down", "outlook cannot connect to the mail server"),
+           ("VPN not connecting", "vpn times out for everyone on the office wifi"),
+           ("Shared drive missing", "the S: drive disappeared after the reboot")]
+
+def storm(client, headers, rng):
+    # Each request: a reporter files one of the outages; a third are retries of their previous attempt
+    lat = {"created": [], "idempotency_key": [], "fingerprint": []}
+    last = {}
+    for i in range(N_REQUESTS):
+        who = rng.randrange(REPORTERS)
+        if who in last and rng.random() < 0.33:
+            title, description, key = last[who]
+        else:
+            title, description = rng.choice(OUTAGES)
+            if rng.random() < 0.5:  # the same report, retyped
+                title = title.upper() + "!!"
+            key = f"{who}-{i}"
+        last[who] = (title, description, key)
+        t0 = time.perf_counter()
+        res = client.post("/incidents", json={"title": title, "description": description},
+                          headers={**headers[who], "Idempotency-Key": key}).json()
+        lat[res.get("matched_on") or "created"].append((time.perf_counter() - t0) * 1000)
+    return lat
+
+def lookup_cost(db):
+    fp = dedupe.fingerprint(1, 1, *OUTAGES[0])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    probe = lambda: [dedupe.find_duplicate(db, 1, f"missing-{i}", fp, now) for i in range(100)]
+    indexed = timeit(probe) / 100
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_incidents_requester_idempotency_key"))
+        conn.execute(text("DROP INDEX ix_incidents_fingerprint_created_at"))
+    scanned = timeit(probe, repeat=2) / 100
+    init_db()
+    return indexed, scanned
+
+def main():
+    init_db()
+    db = SessionLocal()
+    seed(db, N_INCIDENTS)
+    # Give the seeded history fingerprints, as if it had been filed through the API
+    db.bulk_update_mappings(Incident, [
+        {"id": r.id, "fingerprint": dedupe.fingerprint(r.requester_id, r.assigned_group_id, r.title, r.description)}
+        for r in db.query(Incident.id, Incident.requester_id, Incident.assigned_group_id, Incident.title, Incident.description)])
+    db.commit()
+
+    with TestClient(api.app) as client:
+        headers = []
+        for i in range(REPORTERS):
+            token = client.post("/login", json={"email": f"user{i}@example.com", "password": "pw"}).json()["access_token"]
+            headers.append({"Authorization": f"Bearer {token}"})
+        before = db.query(Incident).count(), db.query(OutboxEvent).count()
+        lat = storm(client, headers, random.Random(3))
+        after = db.query(Incident).count(), db.query(OutboxEvent).count()
+        stats = client.get("/dedupe/stats", headers=headers[0]).json()
+
+    print(f"{N_REQUESTS} submits from {REPORTERS} requesters, {len(OUTAGES)} distinct outages, {N_INCIDENTS:,} incidents in the table\n")
+    print(f"{'outcome':<16} {'requests':>8} {'mean ms':>9} {'p50 ms':>9}")
+    for name, values in lat.items():
+        if values:
+            print(f"{name:<16} {len(values):>8} {statistics.mean(values):>9.2f} {statistics.median(values):>9.2f}")
+    print(f"\nincidents written {after[0] - before[0]}, outbox events (predictions) {after[1] - before[1]}; "
+          f"hit rate {stats['hit_rate']:.1%}")
+    indexed, scanned = lookup_cost(db)
+    print(f"duplicate lookup (key miss + fingerprint): {indexed * 1000:.0f}us indexed, {scanned * 1000:.0f}us without the indexes")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_drift.py
+# Drift monitor costs: the O(1) close hook against re-aggregating errors in SQL, P²
+# quantiles against exact ones, token tracking throughput with bounded sketch memory,
+# and an incremental (warm-start) retrain against a full one. Works on a copy of
+# resolution_model.pkl, so the repo's model is never overwritten.
+#   python -m benchmarks.bench_drift [--retrain]   (--retrain adds a full training run: minutes)
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import datetime
+
+from benchmarks.common import use_temp_database, seed, random_text, timeit
+
+use_temp_database("drift")
+MODEL_COPY = os.path.join(tempfile.mkdtemp(prefix="incident_drift_model_"), "resolution_model.pkl")
+if os.path.exists("resolution_model.pkl"):
+    shutil.copy("resolution_model.pkl", MODEL_COPY)
+os.environ["MODEL_PATH"] = MODEL_COPY
+os.environ["DRIFT_RETRAIN_ENABLED"] = "0"
+
+from sqlalchemy import func
+
+from db_config import SessionLocal, init_db, Incident
+import drift
+import predictor
+import train_model
+
+N_INCIDENTS = 20_000
+N_EVENTS = 100_000
+
+def add_predictions(db, rng):
+    # Stand-in predictions: the actual resolution time with multiplicative noise
+    rows = db.query(Incident.id, Incident.created_at, Incident.closed_at).filter(Incident.closed_at.isnot(None)).all()
+    db.bulk_update_mappings(Incident, [
+        {"id": r.id, "predicted_hours": (r.closed_at - r.created_at).total_seconds() / 3600 * rng.lognormvariate(0, 0.5)}
+        for r in rows])
+    db.commit()
+    return len(rows)
+
+def sql_errors(db):
+    # What a non-streaming monitor would re-run: MAE and bias per (group, type) over every close
+    hours = (func.julianday(Incident.closed_at) - func.julianday(Incident.created_at)) * 24
+    err = Incident.predicted_hours - hours
+    return db.query(Incident.assigned_group_id, func.count(), func.avg(func.abs(err)), func.avg(err)).filter(
+        Incident.closed_at.isnot(None), Incident.predicted_hours.isnot(None)).group_by(Incident.assigned_group_id).all()
+
+def main():
+    init_db()
+    db = SessionLocal()
+    rng = random.Random(11)
+    seed(db, N_INCIDENTS, closed_ratio=0.7)
+    n_closed = add_predictions(db, rng)
+
+    t0 = time.perf_counter()
+    drift.MONITOR.warm(db)
+    print(f"warm from {min(n_closed, drift.WARM_LIMIT)} recent closes: {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    # Close hook
+    now = datetime.datetime.now(datetime.timezone.utc)
+    events = [(rng.randint(1, 3), rng.choice(["Network", "Infra", "Software", "General"]), rng.expovariate(1 / 12),
+               now - datetime.timedelta(hours=rng.expovariate(1 / 12)), now) for _ in range(N_EVENTS)]
+    t0 = time.perf_counter()
+    for e in events:
+        drift.MONITOR.record_close(*e)
+    hook_us = (time.perf_counter() - t0) / N_EVENTS * 1e6
+    sql_ms = timeit(lambda: sql_errors(db))
+    print(f"close hook: {hook_us:.1f}us per close; re-aggregating {n_closed} closes in SQL: {sql_ms:.1f}ms")
+
+    # P² against exact quantiles on the same absolute errors
+    errs = []
+    est = drift.ErrorStats()
+    for r in db.query(Incident.predicted_hours, Incident.created_at, Incident.closed_at).filter(Incident.predicted_hours.isnot(None)):
+        e = abs(r.predicted_hours - (r.closed_at - r.created_at).total_seconds() / 3600)
+        errs.append(e); est.add(e)
+    errs.sort()
+    for name, q, p in (("p50", est.p50, 0.5), ("p90", est.p90, 0.9)):
+        exact = errs[int(p * (len(errs) - 1))]
+        print(f"abs error {name}: P² {q.value():.2f}h, exact {exact:.2f}h ({abs(q.value() - exact) / exact:.1%} off)")
+
+    # Token drift
+    if predictor.get_model() is None:
+        print("\nresolution_model.pkl not found: skipping token tracking and retraining")
+        db.close()
+        return
+    texts = [(random_text(rng, 3), random_text(rng, 12) + f" newterm{rng.randint(0, 5000)}") for _ in range(20_000)]
+    t0 = time.perf_counter()
+    for i in range(0, len(texts), 64):
+        drift.MONITOR.observe(texts[i:i + 64])
+    elapsed = time.perf_counter() - t0
+    tokens = drift.MONITOR.tokens
+    print(f"\ntoken tracking: {len(texts) / elapsed:,.0f} incidents/s, {tokens.tokens:,} tokens, "
+          f"sketch holds {len(tokens.counts)} counters (cap {tokens.size}), OOV rate {tokens.oov / tokens.tokens:.1%}")
+    # What every worker pays each DRIFT_REFRESH_SECONDS to see the other workers' closes
+    refresh_ms = timeit(lambda: drift.MONITOR.refresh(db), repeat=3)
+    print(f"refresh from the database ({drift.WARM_LIMIT} closes, {drift.WARM_LIMIT} incident texts): {refresh_ms:.0f}ms")
+
+    if "--retrain" not in sys.argv:
+        db.close()
+        return
+    sys.argv = ["train_model.py"]
+    t0 = time.perf_counter()
+    train_model.main()
+    full_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    train_model.incremental()
+    inc_s = time.perf_counter() - t0
+    print(f"full retrain {full_s:.1f}s, incremental ({train_model.INCREMENTAL_TREES} trees, last "
+          f"{train_model.INCREMENTAL_DAYS:g} days) {inc_s:.1f}s")
+    t0 = time.perf_counter()
+    predictor._checked = 0.0
+    reloaded = predictor.get_model()
+    print(f"predictor picked up the new pickle in {(time.perf_counter() - t0) * 1000:.0f}ms "
+          f"({len(reloaded.named_steps['reg'].estimators_)} trees)")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_export.py
+# Export speed, incremental export, file size and read speed of the Parquet
+# snapshot versus pulling the same training frame through the ORM.
+#   python -m benchmarks.bench_export
+import os
+import random
+import datetime
+
+from benchmarks.common import use_temp_database, seed, timeit
+
+db_path = use_temp_database("export")
+os.environ["EXPORT_DIR"] = os.path.join(os.path.dirname(db_path), "exports")
+
+from sqlalchemy import update
+
+from db_config import SessionLocal, init_db, Incident, IncidentJournal
+import export_data
+import train_model
+
+N_INCIDENTS = 100_000
+JOURNALS_PER_INCIDENT = 3
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def main():
+    init_db()
+    db = SessionLocal()
+    users, _, _ = seed(db, N_INCIDENTS)
+    rng = random.Random(3)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    db.bulk_insert_mappings(IncidentJournal, [
+        {"incident_id": i, "author_user_id": users[0].id, "comment": f"note {rng.random():.6f} on progress", "status": "open", "created_at": now}
+        for i in range(1, N_INCIDENTS + 1) for _ in range(JOURNALS_PER_INCIDENT)
+    ])
+    db.commit()
+
+    print(f"{N_INCIDENTS} incidents, {N_INCIDENTS * JOURNALS_PER_INCIDENT} journals\n")
+    full_ms = timeit(lambda: export_data.export(full=True), repeat=1)
+    ids = [r[0] for r in db.query(Incident.id).limit(1000).all()]
+    db.execute(update(Incident).where(Incident.id.in_(ids)).values(updated_at=datetime.datetime.now(datetime.timezone.utc)))
+    db.commit()
+    incr_ms = timeit(export_data.export, repeat=1)
+    db.close()
+
+    orm_ms = timeit(train_model.fetch_training_data, repeat=3)
+    parquet_ms = timeit(train_model.fetch_training_data_from_export, repeat=3)
+    assert len(train_model.fetch_training_data()) == len(train_model.fetch_training_data_from_export())
+
+    print(f"{'full export':<32} {full_ms:>9.0f} ms")
+    print(f"{'incremental export (1k changed)':<32} {incr_ms:>9.0f} ms")
+    print(f"{'training frame via ORM':<32} {orm_ms:>9.0f} ms")
+    print(f"{'training frame via Parquet':<32} {parquet_ms:>9.0f} ms")
+    print(f"{'SQLite file':<32} {os.path.getsize(db_path) / 1e6:>9.1f} MB")
+    print(f"{'Parquet export':<32} {dir_size(export_data.EXPORT_DIR) / 1e6:>9.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_intervals.py
+# p10/p50/p90 from the forest: latency against the point-only path and against calling
+# each tree's predict, then p10-p90 coverage on held-out closed incidents for a forest
+# trained on seeded history. Works on a copy of resolution_model.pkl.
+#   python -m benchmarks.bench_intervals
+import os
+import random
+import shutil
+import tempfile
+import datetime
+
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("intervals")
+MODEL_COPY = os.path.join(tempfile.mkdtemp(prefix="incident_intervals_model_"), "resolution_model.pkl")
+if os.path.exists("resolution_model.pkl"):
+    shutil.copy("resolution_model.pkl", MODEL_COPY)
+os.environ["MODEL_PATH"] = MODEL_COPY
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from db_config import SessionLocal, init_db, Incident
+from routing import infer_type
+import predictor
+import train_model
+from api import app
+
+BATCHES = [1, 64, 1000]
+N_INCIDENTS = 5_000
+TRAIN_TREES = 100
+BASE_HOURS = {"Network": 4, "Infra": 24, "Software": 12, "General": 8}
+
+def per_tree_predict(model, rows):
+    # The naive way: one predict call per tree
+    Xt = model.named_steps["prep"].transform(pd.DataFrame(rows, columns=predictor.FEATURES))
+    per_tree = np.stack([t.predict(Xt) for t in model.named_steps["reg"].estimators_], axis=1)
+    return per_tree.mean(axis=1), np.quantile(per_tree, predictor.QUANTILES, axis=1)
+
+def overhead(rows):
+    model = predictor.get_model()
+    print(f"{len(model.named_steps['reg'].estimators_)}-tree model\n")
+    print(f"{'batch':>6} {'point ms':>9} {'intervals ms':>13} {'overhead':>9} {'per-tree predict ms':>20}")
+    for n in BATCHES:
+        batch = (rows * (n // len(rows) + 1))[:n]
+        point = timeit(lambda: predictor.predict_hours(batch))
+        intervals = timeit(lambda: predictor.predict_intervals(batch))
+        naive = timeit(lambda: per_tree_predict(model, batch), repeat=3)
+        print(f"{n:>6} {point:>9.2f} {intervals:>13.2f} {intervals / point - 1:>+9.0%} {naive:>20.1f}")
+
+def seed_history(db, rng):
+    # Resolution time driven by type and group, with lognormal noise, so there is something to learn
+    seed(db, N_INCIDENTS, closed_ratio=0.9, seed=5)
+    rows = db.query(Incident.id, Incident.title, Incident.description, Incident.assigned_group_id, Incident.created_at).filter(
+        Incident.closed_at.isnot(None)).all()
+    db.bulk_update_mappings(Incident, [
+        {"id": r.id, "closed_at": r.created_at + datetime.timedelta(
+            hours=BASE_HOURS[infer_type(r.title, r.description)] * (1 + 0.5 * r.assigned_group_id) * rng.lognormvariate(0, 0.6))}
+        for r in rows])
+    db.commit()
+
+def coverage():
+    df = train_model.fetch_training_data().sample(frac=1.0, random_state=1).reset_index(drop=True)
+    cut = int(len(df) * 0.8)
+    train, test = df.iloc[:cut], df.iloc[cut:]
+    model = train_model.build_pipeline(n_estimators=TRAIN_TREES)
+    model.fit(train[predictor.FEATURES], train["resolution_time_hours"])
+    train_model.save(model)
+    predictor._checked = 0.0  # pick up the new pickle now rather than after the reload interval
+
+    preds = predictor.predict_intervals(test[predictor.FEATURES].to_dict("records"))
+    y = test["resolution_time_hours"].to_numpy()
+    p10, p50, p90, mean = (np.array([p[k] for p in preds]) for k in ("p10", "p50", "p90", "hours"))
+    inside = (y >= p10) & (y <= p90)
+    print(f"\ntrained {TRAIN_TREES} trees on {len(train)} closes, {len(test)} held out")
+    print(f"p10-p90 coverage {inside.mean():.1%} (nominal 80%): {(y < p10).mean():.1%} below p10, {(y > p90).mean():.1%} above p90")
+    print(f"MAE: mean {np.abs(y - mean).mean():.2f}h, p50 {np.abs(y - p50).mean():.2f}h; median band width {np.median(p90 - p10):.2f}h")
+
+def main():
+    init_db()
+    rows = [
+        {"title": "vpn down", "description": "vpn disconnects on office wifi", "group": "Network", "type": "Network"},
+        {"title": "db slow", "description": "database server timeout on reports", "group": "Infra", "type": "Infra"},
+        {"title": "app crash", "description": "ui error when saving the form", "group": "Support", "type": "Software"},
+    ]
+    if predictor.get_model() is not None:
+        overhead(rows)
+        client = TestClient(app)
+        body = {"items": (rows * 22)[:64]}
+        point = timeit(lambda: client.post("/predict_resolution_time/batch", json=body).raise_for_status())
+        ranged = timeit(lambda: client.post("/predict_resolution_time/batch", params={"intervals": True}, json=body).raise_for_status())
+        print(f"\nPOST /predict_resolution_time/batch, 64 items: {point:.1f}ms point, {ranged:.1f}ms with intervals")
+    else:
+        print("resolution_model.pkl not found: skipping the latency comparison")
+
+    db = SessionLocal()
+    seed_history(db, random.Random(9))
+    db.close()
+    coverage()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_journals.py
+# Incident detail for an incident with a long journal: the full timeline on every
+# rerun (before) against the first keyset page and an incremental since= poll (after).
+#   python -m benchmarks.bench_journals
+import random
+import datetime
+
+from benchmarks.common import use_temp_database, seed, random_text, timeit
+
+use_temp_database("journals")
+
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+
+from db_config import SessionLocal, init_db, Incident, IncidentJournal
+from responses import journal_query, journals_out
+from api import app
+
+SIZES = [100, 1_000, 10_000]
+
+def add_journals(db, incident_id, author_id, n, rng):
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=30)
+    db.bulk_insert_mappings(IncidentJournal, [
+        {"incident_id": incident_id, "author_user_id": author_id, "status": "in-progress",
+         "comment": random_text(rng, 20), "created_at": start + datetime.timedelta(minutes=k)}
+        for k in range(n)
+    ])
+    db.commit()
+
+def full_timeline(db, incident_id):
+    # get_incident before paging: every journal, every rerun
+    rows = journal_query(db).filter(IncidentJournal.incident_id == incident_id).order_by(IncidentJournal.created_at.asc()).all()
+    return ORJSONResponse({"journals": journals_out(rows)}).body
+
+def main():
+    init_db()
+    db = SessionLocal()
+    users, analysts, _ = seed(db, 20_000)
+    rng = random.Random(3)
+    ids = [r[0] for r in db.query(Incident.id).order_by(Incident.id).limit(len(SIZES)).all()]
+    for incident_id, n in zip(ids, SIZES):
+        add_journals(db, incident_id, analysts[0].id, n, rng)
+    # Background noise from the other incidents
+    add_journals(db, ids[-1] + 1, analysts[1].id, 50_000, rng)
+
+    client = TestClient(app)
+    token = client.post("/login", json={"email": "user0@example.com", "password": "pw"}).json()["access_token"]
+    h = {"Authorization": f"Bearer {token}"}
+    print(f"{'journals':>8} {'full timeline':>14} {'first page':>11} {'since= poll':>12} {'detail, no journals':>20}")
+    for incident_id, n in zip(ids, SIZES):
+        last_id = db.query(IncidentJournal.id).filter(IncidentJournal.incident_id == incident_id).order_by(
+            IncidentJournal.id.desc()).limit(1).scalar()
+        full_ms = timeit(lambda: full_timeline(db, incident_id))
+        page_ms = timeit(lambda: client.get(f"/incident/{incident_id}/journals", headers=h).raise_for_status())
+        poll_ms = timeit(lambda: client.get(f"/incident/{incident_id}/journals", params={"since": last_id}, headers=h).raise_for_status())
+        detail_ms = timeit(lambda: client.get(f"/incident/{incident_id}", params={"journal_limit": 0}, headers=h).raise_for_status())
+        print(f"{n:>8} {full_ms:>12.2f}ms {page_ms:>9.2f}ms {poll_ms:>10.2f}ms {detail_ms:>18.2f}ms")
+
+    # Paging through the whole timeline returns every entry exactly once
+    incident_id, n = ids[-1], SIZES[-1]
+    seen, params = [], {"limit": 500}
+    while True:
+        page = client.get(f"/incident/{incident_id}/journals", params=params, headers=h).json()
+        seen.extend(j["id"] for j in page["journals"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert len(seen) == len(set(seen)) == n
+    db.close()
+
+if __name__ == "__main__":
+    main()
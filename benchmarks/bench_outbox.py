@@ -0,0 +1,86 @@
+# benchmarks/bench_outbox.py
+# POST /incidents latency and throughput with prediction in the outbox workers,
+# against the previous inline flow (commit, refresh, predict, second commit).
+#   python -m benchmarks.bench_outbox
+import time
+import datetime
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import use_temp_database, seed
+
+use_temp_database("outbox")
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from db_config import SessionLocal, init_db, get_db, Group, Incident, IncidentJournal, OutboxEvent
+from auth import TokenUser, current_user
+import api
+import outbox
+import predictor
+
+N_REQUESTS = 300
+THREADS = 8
+
+@api.app.post("/bench/legacy_incidents")
+def legacy_create(data: api.IncidentCreate, requester: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    # The create_incident body before the outbox: two commits with inference in between
+    group = db.query(Group).filter(Group.name == data.group_name).first()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    inc = Incident(title=data.title, description=data.description, status="open", requester_id=requester.id,
+                   assigned_group_id=group.id, created_at=now, updated_at=now)
+    db.add(inc); db.commit(); db.refresh(inc)
+    hours = predictor.predict_hours([{"title": inc.title, "description": inc.description, "group": group.name,
+                                      "type": api.infer_type(inc.title, inc.description)}])
+    if hours:
+        inc.predicted_hours = hours[0]
+        db.add(IncidentJournal(incident_id=inc.id, author_user_id=requester.id, status="open",
+                               comment=f"Projected resolution: {hours[0]:.1f} hours", created_at=now))
+        db.commit()
+    return api.respond({"incident": api.incident_out(db, inc.id)})
+
+def run(client, path, headers):
+    payload = {"title": "vpn drops", "description": "vpn disconnects every few minutes on wifi", "group_name": "Network"}
+    def one(_):
+        t0 = time.perf_counter()
+        client.post(path, json=payload, headers=headers).raise_for_status()
+        return (time.perf_counter() - t0) * 1000
+    sequential = [one(i) for i in range(N_REQUESTS)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(one, range(N_REQUESTS)))
+    throughput = N_REQUESTS / (time.perf_counter() - t0)
+    return sequential, throughput
+
+def report(name, latencies, throughput):
+    p99 = statistics.quantiles(latencies, n=100)[-1]
+    print(f"{name:<8} {statistics.mean(latencies):>9.2f} {statistics.median(latencies):>9.2f} {p99:>9.2f} {throughput:>12.0f}")
+
+def main():
+    init_db()
+    db = SessionLocal()
+    seed(db, 0)
+    db.close()
+    if predictor.get_model() is None:
+        print("warning: resolution_model.pkl not loaded, inference cost is not included")
+    with TestClient(api.app) as client:
+        token = client.post("/login", json={"email": "user0@example.com", "password": "pw"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+        print(f"{N_REQUESTS} sequential requests, then {N_REQUESTS} over {THREADS} threads\n")
+        print(f"{'flow':<8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s (x8)':>12}")
+        report("inline", *run(client, "/bench/legacy_incidents", h))
+        report("outbox", *run(client, "/incidents", h))
+
+        t0 = time.perf_counter()
+        client.portal.call(outbox.dispatcher.drain)
+        print(f"\noutbox drained {time.perf_counter() - t0:.2f}s after the last response")
+    db = SessionLocal()
+    pending = db.query(OutboxEvent).filter(OutboxEvent.processed_at.is_(None)).count()
+    predicted = db.query(Incident).filter(Incident.predicted_hours.isnot(None)).count()
+    print(f"pending outbox rows: {pending}, incidents with a prediction: {predicted}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_routing.py
+# Discrete-event simulation of time-to-assign: analysts polling their group queue
+# (today's manual flow) versus routing.LoadTracker picking an analyst at create time.
+#   python -m benchmarks.bench_routing
+import heapq
+import random
+import statistics
+import time
+
+from routing import LoadTracker, TYPE_TO_GROUP
+
+GROUPS = ["Support", "Infra", "Network"]
+ANALYSTS_PER_GROUP = 3
+ARRIVALS_PER_HOUR = 4.0
+SIM_HOURS = 24 * 5
+POLL_MINUTES = 30        # how often an analyst refreshes the queue page
+MAX_IN_HAND = 2          # manual flow: tickets an analyst pulls before working them down
+MEAN_HOURS = {"Network": 1.5, "Infra": 2.5, "Software": 2.0, "General": 1.0}
+
+def incidents(rng):
+    t, out = 0.0, []
+    while t < SIM_HOURS:
+        t += rng.expovariate(ARRIVALS_PER_HOUR)
+        ptype = rng.choices(list(MEAN_HOURS), weights=[3, 2, 3, 2])[0]
+        actual = rng.expovariate(1 / MEAN_HOURS[ptype])
+        predicted = actual * rng.lognormvariate(0, 0.4)
+        out.append((t, ptype, actual, predicted))
+    return out
+
+def analysts():
+    return {g: [f"{g}-{i}" for i in range(ANALYSTS_PER_GROUP)] for g in GROUPS}
+
+class Sim:
+    def __init__(self, rng):
+        self.rng = rng
+        self.events, self.seq = [], 0
+        self.in_hand = {a: [] for team in analysts().values() for a in team}
+        self.busy = {a: False for a in self.in_hand}
+        self.assigned_at, self.resolved_at, self.work = {}, {}, {}
+
+    def push(self, at, kind, *data):
+        self.seq += 1
+        heapq.heappush(self.events, (at, self.seq, kind, data))
+
+    def start_next(self, now, analyst):
+        if not self.busy[analyst] and self.in_hand[analyst]:
+            self.busy[analyst] = True
+            self.push(now + self.work[self.in_hand[analyst][0]], "done", analyst)
+
+    def finish(self, now, analyst):
+        incident_id = self.in_hand[analyst].pop(0)
+        self.resolved_at[incident_id] = now
+        self.busy[analyst] = False
+        self.start_next(now, analyst)
+        return incident_id
+
+def run_manual(arrivals, rng):
+    sim = Sim(rng)
+    queues = {g: [] for g in GROUPS}
+    team_of = {a: g for g, team in analysts().items() for a in team}
+    for i, (t, ptype, actual, _) in enumerate(arrivals):
+        sim.push(t, "arrive", i, TYPE_TO_GROUP[ptype])
+        sim.work[i] = actual
+    for a in team_of:
+        sim.push(rng.uniform(0, POLL_MINUTES / 60), "poll", a)
+    while sim.events:
+        now, _, kind, data = heapq.heappop(sim.events)
+        if kind == "arrive":
+            queues[data[1]].append(data[0])
+        elif kind == "poll":
+            a = data[0]
+            q = queues[team_of[a]]
+            while q and len(sim.in_hand[a]) < MAX_IN_HAND:
+                incident_id = q.pop(0)
+                sim.assigned_at[incident_id] = now
+                sim.in_hand[a].append(incident_id)
+            sim.start_next(now, a)
+            if now < SIM_HOURS * 2:
+                sim.push(now + rng.uniform(0.5, 1.5) * POLL_MINUTES / 60, "poll", a)
+        elif kind == "done":
+            sim.finish(now, data[0])
+    return sim
+
+def run_auto(arrivals, rng):
+    sim = Sim(rng)
+    tracker = LoadTracker()
+    tracker.loaded = True
+    ids = {}
+    for gid, (g, team) in enumerate(analysts().items()):
+        for a in team:
+            ids[a] = len(ids) + 1
+            tracker.add_member(gid, ids[a], a)
+    group_id = {g: i for i, g in enumerate(GROUPS)}
+    for i, (t, ptype, actual, predicted) in enumerate(arrivals):
+        sim.push(t, "arrive", i, TYPE_TO_GROUP[ptype], predicted)
+        sim.work[i] = actual
+    decide = []
+    while sim.events:
+        now, _, kind, data = heapq.heappop(sim.events)
+        if kind == "arrive":
+            incident_id, group, predicted = data
+            t0 = time.perf_counter()
+            _, analyst = tracker.pick(group_id[group])
+            tracker.assign(incident_id, ids[analyst], predicted, reserved=True)
+            decide.append(time.perf_counter() - t0)
+            sim.assigned_at[incident_id] = now
+            sim.in_hand[analyst].append(incident_id)
+            sim.start_next(now, analyst)
+        elif kind == "done":
+            tracker.release(sim.finish(now, data[0]))
+    sim.decide_us = statistics.mean(decide) * 1e6
+    return sim
+
+def report(name, arrivals, sim):
+    tta = [(sim.assigned_at[i] - arrivals[i][0]) * 60 for i in sim.assigned_at]
+    ttr = [sim.resolved_at[i] - arrivals[i][0] for i in sim.resolved_at]
+    p90 = statistics.quantiles(tta, n=10)[-1] if len(tta) > 1 else 0.0
+    print(f"{name:<8} {statistics.mean(tta):>14.2f} {p90:>13.2f} {statistics.mean(ttr):>16.2f} {len(ttr):>9}")
+
+def main():
+    rng = random.Random(11)
+    arrivals = incidents(rng)
+    print(f"{len(arrivals)} incidents over {SIM_HOURS}h, {ANALYSTS_PER_GROUP} analysts x {len(GROUPS)} groups, poll every {POLL_MINUTES} min\n")
+    print(f"{'flow':<8} {'mean TTA (min)':>14} {'p90 TTA (min)':>13} {'mean resolve (h)':>16} {'resolved':>9}")
+    report("manual", arrivals, run_manual(arrivals, random.Random(1)))
+    auto = run_auto(arrivals, random.Random(1))
+    report("auto", arrivals, auto)
+    print(f"\nauto-routing decision cost: {auto.decide_us:.1f} us per incident")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_scaling.py
+# Throughput against gunicorn worker count on this machine, and what preloading saves:
+# the same worker counts with the app, model and interval arrays loaded once in the
+# master (shared copy-on-write) and loaded separately in every worker. Memory is the
+# proportional set size (PSS) of the master plus workers from /proc, so shared pages
+# are counted once. Admission control is off so the server's own capacity shows.
+#   python -m benchmarks.bench_scaling
+import os
+import sys
+import time
+import shutil
+import signal
+import socket
+import asyncio
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.common import use_temp_database, seed
+
+WORKER_COUNTS = [1, 2, 4]
+CLIENT_PROCS = 2
+CONNECTIONS = 16  # per client process
+SECONDS = 10
+SECRET = "bench-scaling-secret"
+
+def prepare_template():
+    path = use_temp_database("scaling")
+    from db_config import SessionLocal, init_db, engine
+    init_db()
+    db = SessionLocal()
+    seed(db, 20_000)
+    db.close()
+    engine.dispose()
+    return path
+
+def start_server(template, workers, preload):
+    workdir = tempfile.mkdtemp(prefix="incident_scaling_run_")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copy(template, db_path)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "INCIDENT_APP_SECRET": SECRET, "WEB_CONCURRENCY": str(workers),
+           "BIND": f"127.0.0.1:{port}", "PRELOAD_APP": "1" if preload else "0", "ADMISSION_ENABLED": "0",
+           "SLA_SCHEDULER_ENABLED": "0", "ARCHIVE_ENABLED": "0"}
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "api:app", "--log-level", "warning"], env=env)
+    url = f"http://127.0.0.1:{port}"
+    # Ready once every worker has answered /readyz
+    seen, deadline = set(), time.time() + 120
+    while len(seen) < workers and time.time() < deadline:
+        try:
+            r = httpx.get(f"{url}/readyz", timeout=2)
+            if r.status_code == 200:
+                seen.add(r.json()["pid"])
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    return proc, url
+
+def pss_mb(pid):
+    pids = [pid] + [int(p) for p in open(f"/proc/{pid}/task/{pid}/children").read().split()]
+    total = 0
+    for p in pids:
+        for line in open(f"/proc/{p}/smaps_rollup"):
+            if line.startswith("Pss:"):
+                total += int(line.split()[1])
+    return total / 1024, len(pids) - 1
+
+# Client side (each in its own process): closed loop, a mix of predictions and reads
+async def client(url, seconds):
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=httpx.Limits(max_connections=CONNECTIONS)) as c:
+        token = (await c.post("/login", json={"email": "user0@example.com", "password": "pw"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        body = {"title": "vpn down", "description": "vpn disconnects on office wifi", "group": "Network", "type": "Network"}
+        done, errors = 0, 0
+        deadline = time.perf_counter() + seconds
+
+        async def loop(i):
+            nonlocal done, errors
+            n = i
+            while time.perf_counter() < deadline:
+                if n % 2:
+                    r = await c.post("/predict_resolution_time", params={"intervals": True}, json=body)
+                else:
+                    r = await c.get("/incidents/my" if n % 4 == 0 else "/dashboard_stats", headers=headers)
+                done += r.status_code == 200
+                errors += r.status_code != 200
+                n += 1
+        await asyncio.gather(*[loop(i) for i in range(CONNECTIONS)])
+    print(done, errors)
+
+def measure(url):
+    procs = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_scaling", "--client", url, str(SECONDS)],
+                              stdout=subprocess.PIPE, text=True) for _ in range(CLIENT_PROCS)]
+    done = errors = 0
+    for p in procs:
+        d, e = map(int, p.communicate()[0].split())
+        done += d; errors += e
+    return done / SECONDS, errors
+
+def main():
+    if "--client" in sys.argv:
+        i = sys.argv.index("--client")
+        asyncio.run(client(sys.argv[i + 1], float(sys.argv[i + 2])))
+        return
+    os.environ["INCIDENT_APP_SECRET"] = SECRET
+    template = prepare_template()
+    print(f"{os.cpu_count()} CPUs, {CLIENT_PROCS} client processes x {CONNECTIONS} connections, {SECONDS}s per run\n")
+    print(f"{'workers':>7} {'preload':>8} {'req/s':>8} {'errors':>7} {'PSS MB':>8} {'MB/worker':>10}")
+    for workers in WORKER_COUNTS:
+        for preload in (True, False):
+            proc, url = start_server(template, workers, preload)
+            try:
+                rate, errors = measure(url)
+                mb, n = pss_mb(proc.pid)
+                print(f"{workers:>7} {'yes' if preload else 'no':>8} {rate:>8.0f} {errors:>7} {mb:>8.0f} {mb / max(n, 1):>10.0f}")
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_serialization.py
+# Building and encoding 1k/10k-incident responses: ORM objects + dicts +
+# jsonable_encoder + JSONResponse (before) against column tuples + slotted
+# dataclasses + ORJSONResponse (after), plus the end-to-end /incidents/my call.
+#   python -m benchmarks.bench_serialization
+from benchmarks.common import use_temp_database, seed, timeit
+
+use_temp_database("serialization")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from db_config import SessionLocal, init_db, User, Group, GroupMembership, Incident
+from responses import incident_query, incidents_out
+from api import app
+
+SIZES = [1_000, 10_000]
+
+def legacy_serialize(i):
+    return {
+        "id": i.id, "title": i.title, "description": i.description, "status": i.status,
+        "requester_id": i.requester_id, "assigned_group_id": i.assigned_group_id,
+        "assigned_to_user_id": i.assigned_to_user_id, "created_at": i.created_at,
+        "updated_at": i.updated_at, "closed_at": i.closed_at, "predicted_hours": i.predicted_hours,
+        "group": i.assigned_group.name if i.assigned_group else None,
+        "assigned_to": i.assigned_to.email if i.assigned_to else None,
+    }
+
+def legacy(db, user_id):
+    db.expire_all()
+    incs = db.query(Incident).filter(Incident.requester_id == user_id).order_by(Incident.id.desc()).all()
+    return JSONResponse(jsonable_encoder({"incidents": [legacy_serialize(i) for i in incs]})).body
+
+def legacy_encode_only(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+def current(db, user_id):
+    rows = incident_query(db).filter(Incident.requester_id == user_id).order_by(Incident.id.desc()).all()
+    return ORJSONResponse({"incidents": incidents_out(rows)}).body
+
+def main():
+    init_db()
+    client = TestClient(app)
+    print(f"{'rows':>6} {'legacy build+encode':>20} {'legacy encode':>14} {'typed build+encode':>19} {'typed encode':>13} {'GET /incidents/my':>18}")
+    for size in SIZES:
+        db = SessionLocal()
+        for model in (Incident, GroupMembership, Group, User):
+            db.execute(delete(model))
+        db.commit()
+        users, _, _ = seed(db, size, n_users=1, seed=size)
+        uid = users[0].id
+        assert len(legacy(db, uid)) > 0 and len(current(db, uid)) > 0
+
+        incs = db.query(Incident).filter(Incident.requester_id == uid).all()
+        dicts = {"incidents": [legacy_serialize(i) for i in incs]}
+        typed = {"incidents": incidents_out(incident_query(db).filter(Incident.requester_id == uid).all())}
+
+        legacy_ms = timeit(lambda: legacy(db, uid))
+        legacy_enc_ms = timeit(lambda: legacy_encode_only(dicts))
+        current_ms = timeit(lambda: current(db, uid))
+        current_enc_ms = timeit(lambda: ORJSONResponse(typed).body)
+
+        token = client.post("/login", json={"email": "user0@example.com", "password": "pw"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+        e2e_ms = timeit(lambda: client.get("/incidents/my", headers=h).raise_for_status())
+        print(f"{size:>6} {legacy_ms:>18.1f}ms {legacy_enc_ms:>12.1f}ms {current_ms:>17.1f}ms {current_enc_ms:>11.2f}ms {e2e_ms:>16.1f}ms")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_sla.py
+# Cost of an SLA tick at growing open-backlog sizes: the initial indexed load,
+# steady-state delta ticks, and a naive full rescan for comparison.
+#   python -m benchmarks.bench_sla
+import random
+import datetime
+
+from benchmarks.common import use_temp_database, seed, random_text, timeit
+
+use_temp_database("sla")
+
+from sqlalchemy import update
+
+from db_config import SessionLocal, init_db, Incident, IncidentJournal, SlaBreach
+import sla
+
+SIZES = [10_000, 50_000, 200_000]
+
+def naive_scan(db, now):
+    # What a stateless scanner would do every tick
+    rows = db.query(Incident.id, Incident.assigned_group_id, Incident.created_at, Incident.predicted_hours).filter(
+        Incident.status.in_(sla.OPEN_STATUSES)).all()
+    cutoff = now - datetime.timedelta(hours=sla.DEFAULT_TARGET_HOURS)
+    return [r[0] for r in rows if r[2] is not None and sla.as_utc(r[2]) < cutoff]
+
+def main():
+    init_db()
+    db = SessionLocal()
+    seed(db, 0)  # users and groups only
+    db.close()
+    print(f"{'incidents':>10} {'open':>8} {'initial load':>13} {'idle tick':>10} {'100 changed':>12} {'naive rescan':>13}")
+    for size in SIZES:
+        db = SessionLocal()
+        db.query(SlaBreach).delete(); db.query(IncidentJournal).delete(); db.query(Incident).delete(); db.commit()
+        rng = random.Random(size)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        db.bulk_insert_mappings(Incident, [{
+            "title": random_text(rng, 3), "description": random_text(rng, 10),
+            "status": rng.choice(sla.OPEN_STATUSES) if rng.random() < 0.7 else "closed",
+            "requester_id": 1, "assigned_group_id": rng.randint(1, 3),
+            "created_at": (c := now - datetime.timedelta(hours=rng.uniform(0, 72))), "updated_at": c,
+        } for _ in range(size)])
+        db.commit()
+        n_open = db.query(Incident).filter(Incident.status.in_(sla.OPEN_STATUSES)).count()
+
+        engine = sla.SlaEngine()
+        load_ms = timeit(lambda: (engine.reset(), engine.scan(db)), repeat=1)
+        idle_ms = timeit(lambda: engine.scan(db))
+
+        ids = [r[0] for r in db.query(Incident.id).limit(100).all()]
+        def touch_and_scan():
+            stamp = datetime.datetime.now(datetime.timezone.utc)
+            db.execute(update(Incident).where(Incident.id.in_(ids)).values(updated_at=stamp)); db.commit()
+            engine.scan(db)
+        changed_ms = timeit(touch_and_scan)
+        naive_ms = timeit(lambda: naive_scan(db, now))
+        print(f"{size:>10} {n_open:>8} {load_ms:>11.1f}ms {idle_ms:>8.2f}ms {changed_ms:>10.2f}ms {naive_ms:>11.1f}ms")
+        db.close()
+
+if __name__ == "__main__":
+    main()
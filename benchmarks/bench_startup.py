@@ -0,0 +1,88 @@
+# benchmarks/bench_startup.py
+# API process startup: `python -X importtime -c "import api"` against IMPORT_BUDGET_MS,
+# self time by top-level package, a check that the ML stack stays unloaded until the
+# predictor needs it, time to the first response, and what the deferred model load costs.
+# Exits non-zero when over budget or when importing api pulls in an ML module.
+#   python -m benchmarks.bench_startup
+import os
+import re
+import sys
+import json
+import statistics
+import subprocess
+
+from benchmarks.common import use_temp_database
+
+use_temp_database("startup")
+
+RUNS = 5
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 1000))
+ML_MODULES = ("sklearn", "scipy", "pandas", "numpy", "joblib")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+FIRST_RESPONSE = """
+import time
+t0 = time.perf_counter()
+import api
+from fastapi.testclient import TestClient
+with TestClient(api.app) as client:
+    client.post("/login", json={"email": "nobody@example.com", "password": "x"})
+    print((time.perf_counter() - t0) * 1000)
+"""
+
+MODEL_LOAD = """
+import time
+import predictor
+t0 = time.perf_counter()
+model = predictor.load()
+print((time.perf_counter() - t0) * 1000, model is not None)
+"""
+
+def python(*args, **env):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True,
+                          env={**os.environ, **env})
+
+def importtime(module):
+    """(total ms, {top-level package: self ms}) for one cold import."""
+    by_package, total = {}, None
+    for line in python("-X", "importtime", "-c", f"import {module}").stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, name = int(m.group(1)), int(m.group(2)), m.group(4)
+        root = name.split(".")[0]
+        by_package[root] = by_package.get(root, 0) + self_us / 1000
+        if name == module and not m.group(3):
+            total = cumulative_us / 1000
+    return total, by_package
+
+def main():
+    python("migrate.py")
+    runs = [importtime("api") for _ in range(RUNS)]
+    total = statistics.median(t for t, _ in runs)
+    packages = runs[0][1]
+    print(f"import api: median {total:.0f}ms over {RUNS} runs (budget {IMPORT_BUDGET_MS:.0f}ms)\n")
+    print(f"{'package':<20} {'self ms':>8}")
+    for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:12]:
+        print(f"{name:<20} {ms:>8.1f}")
+
+    loaded = json.loads(python("-c", f"import sys, json, api; print(json.dumps([m for m in {ML_MODULES!r} if m in sys.modules]))").stdout)
+    print(f"\nML modules loaded by import api: {', '.join(loaded) or 'none'}")
+
+    first = statistics.median(float(python("-c", FIRST_RESPONSE, PREDICTOR_PRELOAD="0").stdout) for _ in range(3))
+    print(f"process start to first response (import, migrate, lifespan): {first:.0f}ms")
+    load_ms, found = python("-c", MODEL_LOAD).stdout.split()
+    print(f"deferred model load (first prediction or startup preload): {float(load_ms):.0f}ms"
+          + ("" if found == "True" else " (no model file, import cost only)"))
+
+    failures = []
+    if total > IMPORT_BUDGET_MS:
+        failures.append(f"import api took {total:.0f}ms, budget is {IMPORT_BUDGET_MS:.0f}ms")
+    if loaded:
+        failures.append(f"import api loaded {', '.join(loaded)}")
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
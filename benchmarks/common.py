@@ -0,0 +1,59 @@
+# benchmarks/common.py
+# Shared helpers for the benchmark scripts. Run them from the repo root, e.g.
+#   python -m benchmarks.bench_auth
+import os
+import tempfile
+import time
+import random
+import datetime
+
+GROUPS = ["Support", "Infra", "Network"]
+WORDS = ["vpn", "wifi", "server", "database", "bug", "error", "ui", "app", "printer", "login",
+         "password", "email", "slow", "crash", "timeout", "disk", "backup", "certificate", "proxy", "laptop"]
+
+def use_temp_database(name="bench"):
+    """Point db_config at a throwaway SQLite file. Call before importing db_config/api."""
+    path = os.path.join(tempfile.mkdtemp(prefix=f"incident_{name}_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+def random_text(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def seed(db, n_incidents, n_users=50, n_analysts=10, closed_ratio=0.5, seed=7):
+    """Bulk insert users, groups, memberships and incidents spread over the last 90 days."""
+    from db_config import User, Group, GroupMembership, Incident
+
+    rng = random.Random(seed)
+    groups = [Group(name=g) for g in GROUPS]
+    db.add_all(groups); db.flush()
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", password="pw", role="user") for i in range(n_users)]
+    analysts = [User(username=f"analyst{i}", email=f"analyst{i}@example.com", password="pw", role="analyst") for i in range(n_analysts)]
+    db.add_all(users + analysts); db.flush()
+    db.add_all([GroupMembership(user_id=a.id, group_id=groups[i % len(groups)].id, is_active=True) for i, a in enumerate(analysts)])
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = []
+    for i in range(n_incidents):
+        created = now - datetime.timedelta(hours=rng.uniform(0, 90 * 24))
+        closed = created + datetime.timedelta(hours=rng.expovariate(1 / 12)) if rng.random() < closed_ratio else None
+        if closed and closed > now:
+            closed = None
+        analyst = rng.choice(analysts) if closed or rng.random() < 0.5 else None
+        rows.append({
+            "title": random_text(rng, 3), "description": random_text(rng, 12),
+            "status": "closed" if closed else ("assigned" if analyst else "open"),
+            "requester_id": rng.choice(users).id, "assigned_group_id": rng.choice(groups).id,
+            "assigned_to_user_id": analyst.id if analyst else None,
+            "created_at": created, "updated_at": closed or created, "closed_at": closed, "first_closed_at": closed,
+        })
+    db.bulk_insert_mappings(Incident, rows)
+    db.commit()
+    return users, analysts, groups
+
+def timeit(fn, repeat=5):
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
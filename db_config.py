@@ -1,13 +1,33 @@
 # db_config.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+import os
+import datetime
+from sqlalchemy import (create_engine, event, inspect, text, MetaData, Table, Column, Integer, String, Text, ForeignKey,
+                        DateTime, Boolean, Float, Index)
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.schema import CreateTable
 
-DATABASE_URL = "sqlite:///./app.db"  # change if you use another DB
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./app.db")  # change if you use another DB
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# Closed incidents move to a separate SQLite file attached as schema "archive" (see archive.py)
+ARCHIVE_DATABASE_PATH = os.environ.get("ARCHIVE_DATABASE_PATH") or (
+    os.path.join(os.path.dirname(os.path.abspath(engine.url.database)), "archive.db") if engine.url.database else None)
+
+@event.listens_for(engine, "connect")
+def _attach_archive(dbapi_conn, record):
+    if engine.dialect.name == "sqlite" and ARCHIVE_DATABASE_PATH:
+        dbapi_conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DATABASE_PATH,))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
@@ -56,7 +76,12 @@ class Incident(Base):
 
     created_at = Column(DateTime(timezone=True))
     updated_at = Column(DateTime(timezone=True))
-    closed_at = Column(DateTime(timezone=True), nullable=True)
+    closed_at = Column(DateTime(timezone=True), nullable=True)        # latest close; cleared on reopen
+    first_closed_at = Column(DateTime(timezone=True), nullable=True)  # the close the rollups and drift counted
+    predicted_hours = Column(Float, nullable=True)
+    # Duplicate detection on submit (dedupe.py)
+    idempotency_key = Column(String, nullable=True)
+    fingerprint = Column(String, nullable=True)
 
     # Relationships
     requester = relationship(
@@ -68,6 +93,17 @@ class Incident(Base):
     assigned_to = relationship("User", foreign_keys=[assigned_to_user_id])
     journals = relationship("IncidentJournal", back_populates="incident", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Open-backlog scans (SLA) filter on status and walk created_at
+        Index("ix_incidents_status_created_at", "status", "created_at"),
+        Index("ix_incidents_updated_at", "updated_at"),
+        Index("ix_incidents_status_closed_at", "status", "closed_at"),
+        Index("ix_incidents_requester_idempotency_key", "requester_id", "idempotency_key", unique=True),
+        Index("ix_incidents_fingerprint_created_at", "fingerprint", "created_at"),
+        # Archival deletes the newest rows too; AUTOINCREMENT keeps SQLite from handing their ids out again
+        {"sqlite_autoincrement": True},
+    )
+
 # Journals
 class IncidentJournal(Base):
     __tablename__ = "incident_journals"
@@ -80,3 +116,134 @@ class IncidentJournal(Base):
 
     incident = relationship("Incident", back_populates="journals")
     author = relationship("User")
+
+    __table_args__ = (Index("ix_incident_journals_incident_id", "incident_id", "created_at"), {"sqlite_autoincrement": True})
+
+# SLA
+class SlaPolicy(Base):
+    __tablename__ = "sla_policies"
+    id = Column(Integer, primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), unique=True, nullable=False)
+    target_hours = Column(Float, nullable=False)
+    at_risk_ratio = Column(Float, default=0.8)  # fraction of target elapsed before a ticket counts as at risk
+
+    group = relationship("Group")
+
+class SlaBreach(Base):
+    __tablename__ = "sla_breaches"
+    incident_id = Column(Integer, ForeignKey("incidents.id"), primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    deadline = Column(DateTime(timezone=True), nullable=False)
+    breached_at = Column(DateTime(timezone=True), nullable=False)
+
+# Analytics rollups, keyed by (granularity, bucket start, group, inferred type)
+class AnalyticsRollup(Base):
+    __tablename__ = "analytics_rollups"
+    granularity = Column(String, primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), primary_key=True)
+    type = Column(String, primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    closed_count = Column(Integer, nullable=False, default=0)
+    resolution_hours_sum = Column(Float, nullable=False, default=0.0)
+
+class AnalyticsResolutionHist(Base):
+    __tablename__ = "analytics_resolution_hist"
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), primary_key=True)
+    type = Column(String, primary_key=True)
+    bin = Column(Integer, primary_key=True)  # log-scale resolution-hours bin, see analytics.hours_bin
+    count = Column(Integer, nullable=False, default=0)
+
+# Totals across server processes; each adds its own counts (see dedupe.py)
+class DedupeCounter(Base):
+    __tablename__ = "dedupe_counters"
+    name = Column(String, primary_key=True)  # "submitted", "idempotency_key" or "fingerprint"
+    value = Column(Integer, nullable=False, default=0)
+
+# Outbox: post-commit work written in the same transaction as the change (see outbox.py)
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    incident_id = Column(Integer, ForeignKey("incidents.id"), nullable=True)
+    payload = Column(Text, nullable=True)  # JSON
+    created_at = Column(DateTime(timezone=True))
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (Index("ix_outbox_events_pending", "processed_at", "id"),)
+
+# Archive: same columns as the hot tables, no foreign keys (users/groups stay in the main file)
+archive_metadata = MetaData()
+
+def _archive_table(table, *indexes):
+    cols = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in table.columns]
+    return Table(table.name, archive_metadata, *cols, *indexes, schema="archive")
+
+ArchivedIncident = _archive_table(
+    Incident.__table__,
+    Index("ix_archive_incidents_requester_id", "requester_id"),
+)
+ArchivedJournal = _archive_table(
+    IncidentJournal.__table__,
+    Index("ix_archive_incident_journals_incident_id", "incident_id", "created_at"),
+)
+
+# Helpers
+def as_utc(dt):
+    # SQLite hands back naive datetimes even for timezone=True columns; those are UTC already.
+    # Aware ones (query parameters with an offset) are converted: SQLite compares the wall clock
+    if dt is None:
+        return dt
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.astimezone(datetime.timezone.utc)
+
+def _use_autoincrement(conn, table, archived):
+    """Rebuild a table created before AUTOINCREMENT, then keep its id sequence above every archived id."""
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": table.name}).scalar()
+    if sql and "AUTOINCREMENT" not in sql.upper():
+        tmp = f"{table.name}_rebuild"
+        conn.execute(text(str(CreateTable(table).compile(engine)).replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {tmp} ", 1)))
+        names = ", ".join(c.name for c in table.columns)
+        conn.execute(text(f"INSERT INTO {tmp} ({names}) SELECT {names} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))  # takes the old indexes with it; init_db recreates them
+        conn.execute(text(f"ALTER TABLE {tmp} RENAME TO {table.name}"))
+    top = conn.execute(text(f"SELECT coalesce(max(id), 0) FROM {table.name}")).scalar()
+    if ARCHIVE_DATABASE_PATH:
+        top = max(top, conn.execute(text(f"SELECT coalesce(max(id), 0) FROM archive.{archived.name}")).scalar())
+    seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :n"), {"n": table.name}).scalar()
+    if seq is None and top:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:n, :s)"), {"n": table.name, "s": top})
+    elif seq is not None and seq < top:
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :s WHERE name = :n"), {"n": table.name, "s": top})
+
+# Columns added to existing tables that start out as a copy of another column
+_COLUMN_SEEDS = {"first_closed_at": "closed_at"}
+
+def init_db():
+    """Create missing tables, then patch existing ones with new indexes and nullable columns."""
+    Base.metadata.create_all(bind=engine)
+    tables = list(Base.metadata.sorted_tables)
+    if engine.dialect.name == "sqlite" and ARCHIVE_DATABASE_PATH:
+        archive_metadata.create_all(bind=engine)
+        tables += archive_metadata.sorted_tables
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in tables:
+            existing = {c["name"] for c in insp.get_columns(table.name, schema=table.schema)}
+            prefix = f"{table.schema}." if table.schema else ""
+            for col in table.columns:
+                if col.name not in existing and col.nullable:
+                    conn.execute(text(f"ALTER TABLE {prefix}{table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"))
+                    if col.name in _COLUMN_SEEDS:
+                        conn.execute(text(f"UPDATE {prefix}{table.name} SET {col.name} = {_COLUMN_SEEDS[col.name]}"))
+        if engine.dialect.name == "sqlite":
+            for table, archived in ((Incident.__table__, ArchivedIncident), (IncidentJournal.__table__, ArchivedJournal)):
+                _use_autoincrement(conn, table, archived)
+    for table in tables:
+        for ix in table.indexes:
+            ix.create(bind=engine, checkfirst=True)
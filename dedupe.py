@@ -0,0 +1,116 @@
+# dedupe.py
+# Duplicate incident submissions. A client that sends an Idempotency-Key gets the incident
+# its first attempt created back on every retry. Without a key match, a fingerprint of the
+# requester, group and normalized title/description finds the same report filed again
+# within WINDOW_SECONDS while it is still open. Either way a duplicate costs one indexed
+# lookup instead of two inserts, the analytics upserts and an inference.
+# Hit counts are kept in memory so a duplicate stays write-free, and added to the
+# dedupe_counters table every FLUSH_SECONDS, on /dedupe/stats and at shutdown, so the
+# stats cover every server process and survive restarts.
+import os
+import re
+import hashlib
+import datetime
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from db_config import SessionLocal, get_db, Incident, DedupeCounter
+from auth import TokenUser, current_user
+from jobs import PeriodicTask
+
+WINDOW_SECONDS = float(os.environ.get("DEDUPE_WINDOW_SECONDS", 900))
+MAX_KEY_LENGTH = 255
+FLUSH_SECONDS = float(os.environ.get("DEDUPE_FLUSH_SECONDS", 0))
+COUNTERS = ("submitted", "idempotency_key", "fingerprint")
+
+_WORDS = re.compile(r"\w+")
+
+def normalize(text):
+    # Case, punctuation and spacing differences don't make a new report
+    return " ".join(_WORDS.findall((text or "").lower()))
+
+def fingerprint(requester_id, group_id, title, description):
+    raw = "\x1f".join((str(requester_id), str(group_id), normalize(title), normalize(description)))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def find_duplicate(db, requester_id, key, fp, now):
+    """(incident_id, "idempotency_key" | "fingerprint") for an earlier submission, or None.
+
+    A key the requester already used for a different report is a client error (422), not a retry."""
+    if key:
+        row = db.query(Incident.id, Incident.fingerprint).filter(
+            Incident.requester_id == requester_id, Incident.idempotency_key == key).first()
+        if row:
+            if row[1] is not None and row[1] != fp:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different incident")
+            return row[0], "idempotency_key"
+    row = db.query(Incident.id).filter(
+        Incident.fingerprint == fp,
+        Incident.created_at >= now - datetime.timedelta(seconds=WINDOW_SECONDS),
+        Incident.status != "closed",
+    ).order_by(Incident.created_at.desc()).first()
+    return (row[0], "fingerprint") if row else None
+
+class DedupeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = dict.fromkeys(COUNTERS, 0)  # not yet in dedupe_counters
+
+    def record(self, matched_on):
+        with self._lock:
+            self.pending["submitted"] += 1
+            if matched_on:
+                self.pending[matched_on] += 1
+
+    def flush(self, db):
+        with self._lock:
+            pending, self.pending = self.pending, dict.fromkeys(COUNTERS, 0)
+        try:
+            for name, value in pending.items():
+                if value:
+                    stmt = sqlite_insert(DedupeCounter).values(name=name, value=value)
+                    db.execute(stmt.on_conflict_do_update(
+                        index_elements=["name"], set_={"value": DedupeCounter.value + stmt.excluded.value}))
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for name, value in pending.items():
+                    self.pending[name] += value
+            raise
+
+    def summary(self, db):
+        self.flush(db)
+        totals = dict.fromkeys(COUNTERS, 0)
+        totals.update(db.query(DedupeCounter.name, DedupeCounter.value).all())
+        submitted = totals["submitted"]
+        duplicates = totals["idempotency_key"] + totals["fingerprint"]
+        return {
+            "submitted": submitted,
+            "created": submitted - duplicates,
+            "duplicates": duplicates,
+            "by_idempotency_key": totals["idempotency_key"],
+            "by_fingerprint": totals["fingerprint"],
+            "hit_rate": round(duplicates / submitted, 4) if submitted else None,
+            "window_seconds": WINDOW_SECONDS,
+        }
+
+STATS = DedupeStats()
+
+def flush_once():
+    db = SessionLocal()
+    try:
+        STATS.flush(db)
+    finally:
+        db.close()
+
+flusher = PeriodicTask("Dedupe stats flush", flush_once, FLUSH_SECONDS)
+
+router = APIRouter(prefix="/dedupe", tags=["dedupe"])
+
+@router.get("/stats")
+def stats(user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    return STATS.summary(db)
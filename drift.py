@@ -0,0 +1,338 @@
+# drift.py
+# Online accuracy and drift monitoring for the resolution-time model.
+# Every close updates running error statistics per (group, type) in O(1): count, MAE,
+# bias, a recency-weighted MAE and P² estimates of the p50/p90 absolute error. Incoming
+# incidents are tokenized with the model's own TF-IDF analyzers; a Misra-Gries sketch
+# keeps the heaviest tokens in bounded memory and the out-of-vocabulary rate shows how
+# far new text has moved from what the model was trained on. When the recent MAE
+# crosses RETRAIN_MAE_HOURS, train_model.py runs in a subprocess and the predictor
+# picks up the new pickle when its mtime changes. With several server processes each
+# rebuilds its numbers from the database every REFRESH_SECONDS, and only the leader retrains.
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+import subprocess
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from db_config import SessionLocal, get_db, as_utc, Group, Incident
+from auth import TokenUser, current_user
+from routing import infer_type
+from jobs import PeriodicTask
+import predictor
+import leader
+
+log = logging.getLogger("drift")
+
+RECENT_WINDOW = int(os.environ.get("DRIFT_RECENT_WINDOW", 200))  # EWMA span, in events
+WARM_LIMIT = int(os.environ.get("DRIFT_WARM_LIMIT", 5000))
+REFRESH_SECONDS = float(os.environ.get("DRIFT_REFRESH_SECONDS", 0))  # >0: rebuild from the database (other workers' closes)
+TOKEN_SKETCH_SIZE = int(os.environ.get("DRIFT_TOKEN_SKETCH_SIZE", 200))
+RETRAIN_ENABLED = os.environ.get("DRIFT_RETRAIN_ENABLED", "1") == "1"
+RETRAIN_MAE_HOURS = float(os.environ.get("DRIFT_RETRAIN_MAE_HOURS", 24))
+RETRAIN_OOV_RATE = float(os.environ.get("DRIFT_RETRAIN_OOV_RATE", 0.3))  # above this, refit the vocabulary too
+RETRAIN_MIN_CLOSES = int(os.environ.get("DRIFT_RETRAIN_MIN_CLOSES", 100))
+RETRAIN_COOLDOWN_SECONDS = float(os.environ.get("DRIFT_RETRAIN_COOLDOWN_SECONDS", 6 * 3600))
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train_model.py")
+
+ALPHA = 2.0 / (RECENT_WINDOW + 1)
+
+def ewma(prev, x):
+    return x if prev is None else prev + ALPHA * (x - prev)
+
+class P2Quantile:
+    """Streaming estimate of one quantile with five markers (Jain & Chlamtac's P² algorithm)."""
+    __slots__ = ("p", "q", "n", "want", "step")
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []                                   # marker heights
+        self.n = [0, 1, 2, 3, 4]                      # marker positions
+        self.want = [0, 2 * p, 4 * p, 2 + 2 * p, 4]   # desired positions
+        self.step = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+        elif x > q[4]:
+            q[4] = x
+        k = bisect.bisect_right(q, x, 1, 4)  # first marker above x
+        for i in range(k, 5):
+            n[i] += 1
+        for i in range(5):
+            self.want[i] += self.step[i]
+        for i in (1, 2, 3):
+            d = self.want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                h = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = h
+                n[i] += d
+
+    def value(self):
+        if not self.q:
+            return None
+        if len(self.q) < 5:
+            return self.q[round(self.p * (len(self.q) - 1))]
+        return self.q[2]
+
+class ErrorStats:
+    __slots__ = ("count", "abs_sum", "err_sum", "recent_mae", "p50", "p90")
+
+    def __init__(self):
+        self.count = 0
+        self.abs_sum = 0.0
+        self.err_sum = 0.0
+        self.recent_mae = None
+        self.p50 = P2Quantile(0.5)
+        self.p90 = P2Quantile(0.9)
+
+    def add(self, err):
+        self.count += 1
+        self.abs_sum += abs(err)
+        self.err_sum += err
+        self.recent_mae = ewma(self.recent_mae, abs(err))
+        self.p50.add(abs(err))
+        self.p90.add(abs(err))
+
+    def summary(self):
+        r = lambda v: None if v is None else round(v, 2)
+        return {"count": self.count, "mae_hours": r(self.abs_sum / self.count), "bias_hours": r(self.err_sum / self.count),
+                "recent_mae_hours": r(self.recent_mae), "abs_error_p50_hours": r(self.p50.value()),
+                "abs_error_p90_hours": r(self.p90.value())}
+
+class TokenSketch:
+    """Misra-Gries heavy hitters over incoming tokens, plus the out-of-vocabulary rate."""
+
+    def __init__(self, size=TOKEN_SKETCH_SIZE):
+        self.size = size
+        self.counts = {}
+        self.tokens = 0
+        self.oov = 0
+        self.recent_oov_rate = None
+
+    def add(self, tokens, vocabulary):
+        oov = 0
+        for t in tokens:
+            oov += t not in vocabulary
+            if t in self.counts:
+                self.counts[t] += 1
+            elif len(self.counts) < self.size:
+                self.counts[t] = 1
+            else:
+                for k in list(self.counts):
+                    self.counts[k] -= 1
+                    if not self.counts[k]:
+                        del self.counts[k]
+        self.tokens += len(tokens)
+        self.oov += oov
+        if tokens:
+            self.recent_oov_rate = ewma(self.recent_oov_rate, oov / len(tokens))
+
+    def summary(self, vocabulary, top=20):
+        heavy = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        return {
+            "tokens_seen": self.tokens,
+            "oov_rate": round(self.oov / self.tokens, 4) if self.tokens else None,
+            "recent_oov_rate": None if self.recent_oov_rate is None else round(self.recent_oov_rate, 4),
+            "top_tokens": [{"token": t, "count_lower_bound": c, "in_vocabulary": t in vocabulary} for t, c in heavy[:top]],
+            "top_oov_tokens": [{"token": t, "count_lower_bound": c} for t, c in heavy if t not in vocabulary][:top],
+        }
+
+def _add(errors, group_id, ptype, err):
+    for key in ((group_id, ptype), (None, None)):
+        stats = errors.get(key)
+        if stats is None:
+            stats = errors[key] = ErrorStats()
+        stats.add(err)
+
+def _tokenize(analyzers, title, description):
+    tokens = []
+    for analyzer, text in zip(analyzers, (description, title)):
+        tokens.extend(analyzer(text or ""))
+    return tokens
+
+def _error(predicted, created_at, closed_at):
+    actual = (as_utc(closed_at) - as_utc(created_at)).total_seconds() / 3600.0
+    return None if actual < 0 else predicted - actual
+
+class DriftMonitor:
+    """Statistics are rebuilt from the database (recent closes, recent incident text) on first use
+    and every REFRESH_SECONDS, and kept current in between by the close and create hooks. With
+    several server processes the rebuild is what makes every process see every close.
+
+    Retraining is judged on the closes since the loaded pickle was written, which all processes
+    agree on. Those statistics start over as soon as a new pickle is loaded, refresh or not, so
+    the previous model's closes don't count against the new one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.errors = {}    # (group_id, type) -> ErrorStats; (None, None) is the overall total
+        self.since_model = ErrorStats()
+        self.model_mtime = None  # the pickle since_model is measured against
+        self.tokens = TokenSketch()
+        self._model = None
+        self._analyzers = ()
+        self._vocabulary = frozenset()
+        self.retrain_proc = None
+        self.retrain_started = None
+        self.retrain_args = None
+
+    def warm(self, db):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+        self.refresh(db)
+
+    def refresh(self, db):
+        """Rebuild from the database without holding the lock during the queries."""
+        state = self._build(db)
+        with self._lock:
+            self.errors, self.since_model, self.model_mtime, self.tokens = state
+            self.loaded = True
+            self._maybe_retrain()
+
+    def _build(self, db):
+        model = predictor.get_model()
+        with self._lock:
+            if model is not None and model is not self._model:
+                self._use_model(model)
+            analyzers, vocabulary = self._analyzers, self._vocabulary
+        trained_at = predictor.status()["mtime"]
+        errors, since_model = {}, ErrorStats()
+        # first_closed_at, like the close hook: a reopened and re-closed incident counts once
+        rows = db.query(Incident.assigned_group_id, Incident.title, Incident.description, Incident.predicted_hours,
+                        Incident.created_at, Incident.first_closed_at).filter(
+            Incident.first_closed_at.isnot(None), Incident.predicted_hours.isnot(None)).order_by(
+            Incident.first_closed_at.desc()).limit(WARM_LIMIT).all()
+        for group_id, title, description, predicted, created_at, closed_at in reversed(rows):
+            err = _error(predicted, created_at, closed_at)
+            if err is None:
+                continue
+            _add(errors, group_id, infer_type(title, description), err)
+            if trained_at is None or as_utc(closed_at).timestamp() > trained_at:
+                since_model.add(err)
+        tokens = TokenSketch()
+        if analyzers:
+            texts = db.query(Incident.title, Incident.description).order_by(Incident.id.desc()).limit(WARM_LIMIT).all()
+            for title, description in reversed(texts):
+                tokens.add(_tokenize(analyzers, title, description), vocabulary)
+        return errors, since_model, trained_at, tokens
+
+    # Hooks
+    def record_close(self, group_id, ptype, predicted, created_at, closed_at):
+        with self._lock:
+            if not self.loaded:
+                return  # warm() reads it back from the database
+            err = _error(predicted, created_at, closed_at)
+            if err is None:
+                return
+            _add(self.errors, group_id, ptype, err)
+            self._follow_model()
+            self.since_model.add(err)
+            self._maybe_retrain()
+
+    def observe(self, texts):
+        """Tokenize incoming (title, description) pairs with the model's analyzers."""
+        model = predictor.get_model()
+        if model is None:
+            return
+        with self._lock:
+            if model is not self._model:
+                self._use_model(model)
+            for title, description in texts:
+                self.tokens.add(_tokenize(self._analyzers, title, description), self._vocabulary)
+
+    def _use_model(self, model):
+        # A new model brings a new vocabulary, so token drift starts over
+        prep = model.named_steps["prep"]
+        vectorizers = [prep.named_transformers_[name] for name in ("desc", "title")]
+        self._model = model
+        self._analyzers = tuple(v.build_analyzer() for v in vectorizers)
+        self._vocabulary = frozenset().union(*(v.vocabulary_ for v in vectorizers))
+        self.tokens = TokenSketch()
+
+    def _follow_model(self):
+        mtime = predictor.status()["mtime"]
+        if mtime != self.model_mtime:
+            self.model_mtime = mtime
+            self.since_model = ErrorStats()
+
+    def _maybe_retrain(self):
+        self._follow_model()
+        if self.retrain_proc is not None and self.retrain_proc.poll() is None:
+            return
+        recent = self.since_model
+        if (not RETRAIN_ENABLED or recent.count < RETRAIN_MIN_CLOSES or recent.recent_mae < RETRAIN_MAE_HOURS
+                or not leader.is_leader()):
+            return
+        if self.retrain_started and time.time() - self.retrain_started < RETRAIN_COOLDOWN_SECONDS:
+            return
+        oov = self.tokens.recent_oov_rate
+        self.retrain_args = [] if oov is not None and oov > RETRAIN_OOV_RATE else ["--incremental"]
+        log.warning("Recent MAE %.1fh over %.1fh, running train_model.py %s", recent.recent_mae, RETRAIN_MAE_HOURS,
+                    " ".join(self.retrain_args))
+        try:
+            self.retrain_proc = subprocess.Popen([sys.executable, TRAIN_SCRIPT, *self.retrain_args], cwd=os.path.dirname(TRAIN_SCRIPT))
+        except OSError:
+            log.exception("Could not start retraining")
+            return
+        self.retrain_started = time.time()
+
+    def summary(self, group_names):
+        with self._lock:
+            self._follow_model()
+            by_key = []
+            for (group_id, ptype), stats in self.errors.items():
+                if group_id is None and ptype is None:
+                    continue
+                by_key.append({"group": group_names.get(group_id), "type": ptype, **stats.summary()})
+            overall = self.errors.get((None, None))
+            running = self.retrain_proc is not None and self.retrain_proc.poll() is None
+            recent = self.since_model
+            return {
+                "overall": overall.summary() if overall else None,
+                "by_group_type": sorted(by_key, key=lambda r: (str(r["group"]), r["type"])),
+                "tokens": self.tokens.summary(self._vocabulary),
+                "retrain": {
+                    "enabled": RETRAIN_ENABLED, "mae_threshold_hours": RETRAIN_MAE_HOURS,
+                    "closes_since_model": recent.count, "recent_mae_since_model_hours": None if recent.recent_mae is None
+                    else round(recent.recent_mae, 2), "running": running,
+                    "last_started": self.retrain_started, "last_args": self.retrain_args,
+                    "last_exit_code": None if running or self.retrain_proc is None else self.retrain_proc.returncode,
+                },
+            }
+
+MONITOR = DriftMonitor()
+
+def refresh_once():
+    db = SessionLocal()
+    try:
+        MONITOR.refresh(db)
+    finally:
+        db.close()
+
+refresher = PeriodicTask("Drift refresh", refresh_once, REFRESH_SECONDS)
+
+router = APIRouter(prefix="/drift", tags=["drift"])
+
+@router.get("/summary")
+def summary(user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    MONITOR.warm(db)
+    names = dict(db.query(Group.id, Group.name).all())
+    return MONITOR.summary(names)
@@ -0,0 +1,158 @@
+# export_data.py
+# Incremental Parquet snapshots of the app tables, so training and analysis read
+# columnar files instead of holding read locks on the live SQLite database.
+import os
+import sys
+import json
+import shutil
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from db_config import SessionLocal, as_utc, User, Group, Incident, IncidentJournal, ArchivedIncident, ArchivedJournal
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "./exports")
+WATERMARKS = "_watermarks.json"
+# updated_at is stamped before the commit, so rows can commit out of order: each run re-reads
+# this far behind the incident watermark (a re-read row is the same version, read_frame keeps one)
+WATERMARK_LAG_SECONDS = float(os.environ.get("EXPORT_WATERMARK_LAG_SECONDS", 60))
+
+TS = pa.timestamp("us", tz="UTC")
+SCHEMAS = {
+    "incidents": pa.schema([
+        ("id", pa.int64()), ("title", pa.string()), ("description", pa.string()), ("status", pa.string()),
+        ("requester_id", pa.int64()), ("assigned_group_id", pa.int64()), ("assigned_to_user_id", pa.int64()),
+        ("created_at", TS), ("updated_at", TS), ("closed_at", TS), ("predicted_hours", pa.float64()),
+        ("first_closed_at", TS),
+    ]),
+    "incident_journals": pa.schema([
+        ("id", pa.int64()), ("incident_id", pa.int64()), ("author_user_id", pa.int64()),
+        ("comment", pa.string()), ("status", pa.string()), ("created_at", TS),
+    ]),
+    "groups": pa.schema([("id", pa.int64()), ("name", pa.string())]),
+    "users": pa.schema([("id", pa.int64()), ("username", pa.string()), ("email", pa.string()), ("role", pa.string())]),  # no passwords
+}
+MODELS = {"incidents": Incident, "incident_journals": IncidentJournal, "groups": Group, "users": User}
+ARCHIVES = {"incidents": ArchivedIncident, "incident_journals": ArchivedJournal}
+PARTITIONING = ds.partitioning(pa.schema([("created_month", pa.string())]), flavor="hive")
+
+def _path(*parts):
+    return os.path.join(EXPORT_DIR, *parts)
+
+def load_watermarks():
+    try:
+        with open(_path(WATERMARKS)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_watermarks(marks):
+    tmp = _path(WATERMARKS + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(marks, f, indent=2)
+    os.replace(tmp, _path(WATERMARKS))
+
+def _to_arrow(name, rows):
+    schema = SCHEMAS[name]
+    cols = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, values in zip(schema, cols):
+        if field.type == TS:
+            values = [as_utc(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _query(db, name, archived=False):
+    table = ARCHIVES[name] if archived else MODELS[name].__table__
+    return db.query(*[table.c[f.name] for f in SCHEMAS[name]])
+
+def _append(name, table, run_id):
+    table = table.append_column("created_month", pc.strftime(table["created_at"], format="%Y-%m"))
+    ds.write_dataset(table, _path(name), format="parquet", partitioning=PARTITIONING,
+                     basename_template=f"part-{run_id}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore")
+
+def export(full=False):
+    """Write everything changed since the last run. Returns {table: rows written}."""
+    if full and os.path.isdir(EXPORT_DIR):
+        shutil.rmtree(EXPORT_DIR)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    marks = {} if full else load_watermarks()
+    run_id = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    written = {}
+    db = SessionLocal()
+    try:
+        # Incidents change in place: take every row touched since the watermark. The
+        # same id can then live in several parts, and read_frame keeps the newest.
+        q = _query(db, "incidents")
+        mark = datetime.datetime.fromisoformat(marks["incidents"]) if marks.get("incidents") else None
+        if mark:
+            q = q.filter(Incident.updated_at >= mark - datetime.timedelta(seconds=WATERMARK_LAG_SECONDS))
+        rows = q.order_by(Incident.updated_at).all()
+        if not marks.get("incidents"):
+            # First run: archived incidents never change again, so they are only read once
+            rows = _query(db, "incidents", archived=True).all() + rows
+        if rows:
+            table = _to_arrow("incidents", rows)
+            _append("incidents", table, run_id)
+            marks["incidents"] = max(filter(None, [mark, pc.max(table["updated_at"]).as_py()])).isoformat()
+        written["incidents"] = len(rows)
+
+        # Journals are append-only, so the id is a sufficient watermark
+        q = _query(db, "incident_journals").filter(IncidentJournal.id > marks.get("incident_journals", 0))
+        rows = q.order_by(IncidentJournal.id).all()
+        if not marks.get("incident_journals"):
+            rows = _query(db, "incident_journals", archived=True).all() + rows
+        if rows:
+            _append("incident_journals", _to_arrow("incident_journals", rows), run_id)
+            marks["incident_journals"] = max(r[0] for r in rows)
+        written["incident_journals"] = len(rows)
+
+        # Small lookup tables are rewritten whole
+        for name in ("groups", "users"):
+            rows = _query(db, name).all()
+            os.makedirs(_path(name), exist_ok=True)
+            pq.write_table(_to_arrow(name, rows), _path(name, f"{name}.parquet"))
+            written[name] = len(rows)
+    finally:
+        db.close()
+    save_watermarks(marks)
+    return written
+
+def read_table(name, columns=None, filter=None) -> pa.Table:
+    """Memory-mapped read of an exported table, newest version of each incident only."""
+    local = fs.LocalFileSystem(use_mmap=True)
+    if name in ("groups", "users"):
+        return pq.read_table(_path(name, f"{name}.parquet"), columns=columns, memory_map=True)
+    # The full schema, so parts written before a column was added read it as nulls
+    schema = SCHEMAS[name].append(pa.field("created_month", pa.string()))
+    dataset = ds.dataset(_path(name), schema=schema, format="parquet", partitioning=PARTITIONING, filesystem=local)
+    if name != "incidents":
+        return dataset.to_table(columns=columns, filter=filter)
+    # Dedupe before filtering so a stale version can never satisfy the filter
+    wanted = None if columns is None or filter is not None else list(dict.fromkeys(["id", "updated_at"] + list(columns)))
+    table = dataset.to_table(columns=wanted)
+    table = table.sort_by([("id", "ascending"), ("updated_at", "descending")])
+    ids = table["id"].to_numpy()
+    newest = np.ones(len(ids), dtype=bool)
+    newest[1:] = ids[1:] != ids[:-1]
+    table = table.filter(pa.array(newest))
+    if filter is not None:
+        table = table.filter(filter)
+    return table if columns is None else table.select(list(columns))
+
+def read_frame(name, columns=None, filter=None) -> pd.DataFrame:
+    return read_table(name, columns=columns, filter=filter).to_pandas()
+
+def main():
+    full = "--full" in sys.argv
+    written = export(full=full)
+    print("✅ Exported " + ", ".join(f"{n}: {c}" for n, c in written.items()) + f" to {EXPORT_DIR}")
+
+if __name__ == "__main__":
+    main()
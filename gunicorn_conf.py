@@ -0,0 +1,62 @@
+# gunicorn_conf.py
+# Production server: a gunicorn master with uvicorn workers (Linux/macOS).
+#   gunicorn -c gunicorn_conf.py api:app
+# The master imports the app, migrates the schema, loads the model and its interval
+# arrays, then freezes the heap before forking, so every worker shares those pages
+# copy-on-write instead of holding its own copy. Background jobs that must run once
+# are led by one worker (leader.py).
+#   kill -HUP <master>   graceful reload: reloads the model in the master, starts fresh
+#                        workers, lets the old ones finish their requests
+#   kill -USR2 <master>  new master with new code (then -QUIT the old one); HUP alone
+#                        keeps the preloaded code
+import gc
+import os
+import multiprocessing
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+keepalive = 5
+max_requests = int(os.environ.get("MAX_REQUESTS", 0))  # >0 recycles workers; jitter keeps them from restarting together
+max_requests_jitter = max_requests // 10
+
+# auth.py falls back to a random per-process secret; with several workers a token signed by
+# one would be rejected by the others (and every restart logs everyone out)
+if workers > 1 and not os.environ.get("INCIDENT_APP_SECRET"):
+    raise RuntimeError("Set INCIDENT_APP_SECRET when running more than one worker")
+
+# Read at import time by the app modules, which the master imports before any hook runs
+os.environ.setdefault("AUTO_MIGRATE", "0")        # the master migrates once, below
+os.environ.setdefault("PREDICTOR_PRELOAD", "0" if preload_app else "1")  # else each worker loads its own
+if workers > 1:
+    os.environ.setdefault("ROUTING_REFRESH_SECONDS", "5")  # other workers' assignments
+    os.environ.setdefault("DRIFT_REFRESH_SECONDS", "30")   # and their closes
+    os.environ.setdefault("DEDUPE_FLUSH_SECONDS", "30")    # this worker's dedupe counts, for the others
+
+def preload_shared_state(server):
+    import predictor
+    import drift
+    from db_config import engine
+    model = predictor.preload()
+    if model is not None:
+        drift.MONITOR.observe([])  # builds the vocabulary set once, here
+    engine.dispose()  # connections must not cross fork
+    gc.collect()
+    gc.freeze()  # keep the collector from touching (and so copying) the shared pages in each worker
+    server.log.info("Preloaded model: %s", predictor.status())
+
+def when_ready(server):
+    from db_config import init_db, engine
+    init_db()
+    engine.dispose()
+    if preload_app:
+        preload_shared_state(server)
+
+def on_reload(server):
+    # A retrained pickle gets loaded once here instead of separately in each new worker
+    if preload_app:
+        gc.unfreeze()
+        preload_shared_state(server)
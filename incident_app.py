@@ -2,6 +2,7 @@
 import streamlit as st
 import requests
 import time
+import uuid
 
 st.set_page_config(page_title="Incident Management", layout="wide")
 API = "http://127.0.0.1:8000"
@@ -12,18 +13,63 @@ for key, default in [
     ("user_email", None),
     ("username", None),
     ("role", None),
+    ("token", None),
     ("incident_id", None),
     ("analyst_group", "Support"),
+    ("journals", {}),
 ]:
     if key not in st.session_state:
         st.session_state[key] = default
 
 def require_login():
-    if not st.session_state["user_email"] or not st.session_state["username"]:
+    if not st.session_state["user_email"] or not st.session_state["username"] or not st.session_state["token"]:
         st.warning("You must be logged in.")
         st.session_state["page"] = "login"
         st.rerun()
 
+def auth_headers():
+    return {"Authorization": f"Bearer {st.session_state['token']}"}
+
+JOURNAL_PAGE = 100
+
+def journal_page(inc_id, params):
+    r = requests.get(f"{API}/incident/{inc_id}/journals", params={"limit": JOURNAL_PAGE, **params}, headers=auth_headers())
+    r.raise_for_status()
+    return r.json()
+
+def merge_journals(cache, new):
+    rows = cache["rows"]
+    seen = {j["id"] for j in rows}
+    new = [j for j in new if j["id"] not in seen]
+    if new:
+        rows.extend(new)
+        rows.sort(key=lambda j: (j["created_at"], j["id"]))
+        cache["last_id"] = max(j["id"] for j in rows)
+
+def fetch_journals(inc_id):
+    """Journal cache for the open incident: the first call loads the newest page only,
+    later reruns only ask for entries added since the last one seen."""
+    cache = st.session_state["journals"]
+    if cache.get("incident_id") != inc_id:
+        page = journal_page(inc_id, {"order": "desc"})
+        cache = st.session_state["journals"] = {"incident_id": inc_id, "rows": [], "last_id": None, "older": page["next_cursor"]}
+        merge_journals(cache, page["journals"])
+        return cache
+    params = {"since": cache["last_id"] or 0}
+    while True:
+        page = journal_page(inc_id, params)
+        merge_journals(cache, page["journals"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    return cache
+
+def load_older_journals(inc_id):
+    cache = st.session_state["journals"]
+    page = journal_page(inc_id, {"order": "desc", "cursor": cache["older"]})
+    merge_journals(cache, page["journals"])
+    cache["older"] = page["next_cursor"]
+
 def top_auth_nav():
     c1, c2 = st.columns(2)
     with c1:
@@ -79,6 +125,7 @@ elif st.session_state["page"] == "login":
                 st.session_state["user_email"] = email
                 st.session_state["username"] = res.get("user")
                 st.session_state["role"] = res.get("role")
+                st.session_state["token"] = res.get("access_token")
                 st.success(f"Welcome {st.session_state['username']} ({st.session_state['role']})")
                 st.session_state["page"] = "dashboard"; st.rerun()
             else:
@@ -105,25 +152,33 @@ elif st.session_state["page"] == "dashboard":
         st.subheader("📝 Create Incident")
         title = st.text_input("Title")
         description = st.text_area("Description")
-        group_name = st.selectbox("Assign to Group", ["Support", "Infra", "Network"])
+        group_name = st.selectbox("Assign to Group", ["Auto", "Support", "Infra", "Network"])
 
-        if st.button("Ensure Group Exists"):
+        if group_name != "Auto" and st.button("Ensure Group Exists"):
             try:
-                rg = requests.post(f"{API}/groups/create", params={"name": group_name})
+                rg = requests.post(f"{API}/groups/create", params={"name": group_name}, headers=auth_headers())
                 st.info(rg.json().get("message", "Done"))
             except Exception as e:
                 st.error(f"API error: {e}")
 
         if st.button("Submit Incident"):
-            payload = {"title": title, "description": description, "group_name": group_name}
+            payload = {"title": title, "description": description, "group_name": None if group_name == "Auto" else group_name}
+            # Same form contents, same key: a double click or a retry after a timeout replays the first incident
+            sent = st.session_state.get("submit_key")
+            if not sent or sent[0] != payload:
+                sent = st.session_state["submit_key"] = (payload, uuid.uuid4().hex)
             try:
-                r = requests.post(f"{API}/incidents", params={"requester_email": st.session_state["user_email"]}, json=payload)
+                r = requests.post(f"{API}/incidents", json=payload, headers={**auth_headers(), "Idempotency-Key": sent[1]})
                 try:
                     res = r.json()
                 except Exception:
                     st.error(f"Unexpected response: {r.text}"); st.stop()
                 if r.status_code == 200:
-                    st.success(f"Created Incident #{res['incident']['id']}")
+                    st.session_state.pop("submit_key", None)
+                    if res.get("duplicate_of"):
+                        st.info(f"Already reported as Incident #{res['duplicate_of']}")
+                    else:
+                        st.success(f"Created Incident #{res['incident']['id']}")
                     st.session_state["incident_id"] = res["incident"]["id"]
                     st.session_state["page"] = "incident_detail"; st.rerun()
                 else:
@@ -134,7 +189,7 @@ elif st.session_state["page"] == "dashboard":
         # Stats card
         st.subheader("📈 My Stats")
         try:
-            ds = requests.get(f"{API}/dashboard_stats", params={"email": st.session_state["user_email"]}).json()
+            ds = requests.get(f"{API}/dashboard_stats", headers=auth_headers()).json()
             c1, c2 = st.columns(2)
             with c1:
                 st.metric("📂 Open Incidents", ds.get("open_incidents", 0))
@@ -147,7 +202,7 @@ elif st.session_state["page"] == "dashboard":
         # My Incidents
         st.subheader("📂 My Incidents")
         try:
-            r = requests.get(f"{API}/incidents/my", params={"email": st.session_state["user_email"]})
+            r = requests.get(f"{API}/incidents/my", headers=auth_headers())
             res = r.json()
             incidents = res.get("incidents", [])
             cols = st.columns(3)
@@ -172,20 +227,23 @@ elif st.session_state["page"] == "dashboard":
         with c1:
             if st.button("Ensure Group Exists"):
                 try:
-                    rg = requests.post(f"{API}/groups/create", params={"name": st.session_state['analyst_group']})
+                    rg = requests.post(f"{API}/groups/create", params={"name": st.session_state['analyst_group']}, headers=auth_headers())
                     st.info(rg.json().get("message", "Done"))
                 except Exception as e:
                     st.error(f"API error: {e}")
         with c2:
             if st.button("Join Group"):
                 try:
-                    ra = requests.post(f"{API}/groups/add_analyst", params={"analyst_email": st.session_state["user_email"], "group_name": st.session_state["analyst_group"]})
-                    st.info(ra.json().get("message", "Done"))
+                    ra = requests.post(f"{API}/groups/add_analyst", params={"group_name": st.session_state["analyst_group"]}, headers=auth_headers())
+                    resa = ra.json()
+                    if resa.get("access_token"):
+                        st.session_state["token"] = resa["access_token"]
+                    st.info(resa.get("message", resa.get("detail", "Done")))
                 except Exception as e:
                     st.error(f"API error: {e}")
 
         try:
-            rq = requests.get(f"{API}/incidents/group_queue", params={"group_name": st.session_state["analyst_group"]})
+            rq = requests.get(f"{API}/incidents/group_queue", params={"group_name": st.session_state["analyst_group"]}, headers=auth_headers())
             resq = rq.json()
             open_incidents = resq.get("open_incidents", [])
             st.caption(f"Open in {st.session_state['analyst_group']}: {len(open_incidents)}")
@@ -197,7 +255,7 @@ elif st.session_state["page"] == "dashboard":
                     st.write(inc.get("description", ""))
                     if st.button(f"Assign to me #{inc['id']}", key=f"assign_{inc['id']}"):
                         try:
-                            ra = requests.post(f"{API}/incidents/{inc['id']}/assign", json={"analyst_email": st.session_state["user_email"]})
+                            ra = requests.post(f"{API}/incidents/{inc['id']}/assign", json={}, headers=auth_headers())
                             resa = ra.json()
                             if ra.status_code == 200:
                                 st.success(f"Assigned #{inc['id']} to you")
@@ -212,7 +270,7 @@ elif st.session_state["page"] == "dashboard":
         
         st.subheader("📂 My Assigned Tickets")
         try:
-            r = requests.get(f"{API}/incidents/assigned", params={"email": st.session_state["user_email"]})
+            r = requests.get(f"{API}/incidents/assigned", headers=auth_headers())
             res = r.json()
             assigned = res.get("assigned_incidents", [])
             cols = st.columns(3)
@@ -242,10 +300,11 @@ elif st.session_state["page"] == "incident_detail":
         if st.button("🏠 Home"): st.session_state["page"] = "home"; st.rerun()
 
     try:
-        r = requests.get(f"{API}/incident/{inc_id}")
+        r = requests.get(f"{API}/incident/{inc_id}", params={"journal_limit": 0}, headers=auth_headers())
         res = r.json()
         inc = res["incident"]
-        journals = res.get("journals", [])
+        journal_cache = fetch_journals(inc_id)
+        journals = journal_cache["rows"]
 
         st.markdown(f"**Title:** {inc['title']}")
         st.markdown(f"**Description:** {inc['description']}")
@@ -262,10 +321,12 @@ elif st.session_state["page"] == "incident_detail":
                 "description": inc["description"],
                 "group": inc.get("group") or "Unknown",
                 "type": ptype
-            })
+            }, params={"intervals": True})
             pres = pr.json()
             if pr.status_code == 200:
-                st.info(f"⏳ Projected Resolution Time: {pres['predicted_resolution_hours']:.1f} hours")
+                band = pres["interval_hours"]
+                st.info(f"⏳ Projected Resolution Time: {pres['predicted_resolution_hours']:.1f} hours "
+                        f"(likely {band['p10']:.1f}–{band['p90']:.1f} hours)")
             else:
                 st.warning(f"Prediction unavailable: {pres.get('detail')}")
         except Exception as e:
@@ -289,6 +350,8 @@ elif st.session_state["page"] == "incident_detail":
         # Journal
         st.subheader("📝 Journal")
         if journals:
+            if journal_cache["older"] and st.button("Show older entries"):
+                load_older_journals(inc_id); st.rerun()
             for j in journals:
                 st.markdown(f"- {j['created_at']} — **{j['author']}** — {j.get('status') or ''}")
                 st.write(j["comment"])
@@ -302,7 +365,7 @@ elif st.session_state["page"] == "incident_detail":
             comment = st.text_area("Comment", placeholder="What changed? What did you do?")
             if st.button("Update Incident"):
                 try:
-                    ru = requests.post(f"{API}/incidents/{inc_id}/update", params={"author_email": st.session_state["user_email"]}, json={"status": new_status, "comment": comment})
+                    ru = requests.post(f"{API}/incidents/{inc_id}/update", json={"status": new_status, "comment": comment}, headers=auth_headers())
                     resu = ru.json()
                     if ru.status_code == 200:
                         st.success("Incident updated"); st.session_state["page"] = "incident_detail"; st.rerun()
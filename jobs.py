@@ -0,0 +1,36 @@
+# jobs.py
+import asyncio
+import logging
+from typing import Optional
+
+log = logging.getLogger("jobs")
+
+class PeriodicTask:
+    """Run a blocking function in a worker thread every `interval` seconds inside the API event loop."""
+
+    def __init__(self, name, fn, interval):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.fn)
+            except Exception:
+                log.exception("%s failed", self.name)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,48 @@
+# leader.py
+# With several server processes (gunicorn_conf.py), jobs that write shared state must run
+# in one of them only: SLA breach journaling, archival, drift retraining and the outbox
+# sweeper. Every process tries a non-blocking exclusive lock on LOCK_PATH; the holder is
+# the leader until it exits, when the OS drops the lock and the next process to ask
+# takes over. Without fcntl (Windows) there is only ever one process, and it leads.
+import os
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from db_config import engine
+
+log = logging.getLogger("leader")
+
+LOCK_PATH = os.environ.get("LEADER_LOCK_PATH") or (
+    f"{os.path.abspath(engine.url.database)}.leader.lock" if engine.url.database else "incident_app.leader.lock")
+
+_fd = None
+_pid = None  # a descriptor inherited through fork is not ours: its lock is shared with the parent
+
+def is_leader():
+    global _fd, _pid
+    if fcntl is None:
+        return True
+    if _fd is not None and _pid == os.getpid():
+        return True
+    fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _fd, _pid = fd, os.getpid()
+    log.info("Process %s is the background job leader", _pid)
+    return True
+
+def release():
+    global _fd, _pid
+    if _fd is not None and _pid == os.getpid():
+        fcntl.flock(_fd, fcntl.LOCK_UN)
+        os.close(_fd)
+    _fd = _pid = None
@@ -0,0 +1,12 @@
+# migrate.py
+# Creates missing tables, columns and indexes. Run it before starting the API, or
+# leave AUTO_MIGRATE=1 (the default) and the API runs it during startup.
+#   python migrate.py
+from db_config import init_db
+
+def main():
+    init_db()
+    print("✅ Database schema is up to date")
+
+if __name__ == "__main__":
+    main()
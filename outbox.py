@@ -0,0 +1,175 @@
+# outbox.py
+# Durable post-commit work. Requests write an outbox row in the same transaction as
+# the change they describe; an in-process worker pool drains the rows in batches.
+# Rows that were never processed (crash, restart, other worker) are swept back in by the
+# leader process once they are older than SWEEP_MIN_AGE_SECONDS, so a row its own
+# process is about to handle is not picked up twice.
+import os
+import json
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from db_config import SessionLocal, Incident, IncidentJournal, Group, OutboxEvent
+import predictor
+import routing
+import drift
+import leader
+
+log = logging.getLogger("outbox")
+
+WORKERS = int(os.environ.get("OUTBOX_WORKERS", 2))
+BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 64))
+BATCH_WINDOW_SECONDS = float(os.environ.get("OUTBOX_BATCH_WINDOW_SECONDS", 0.05))
+SWEEP_SECONDS = float(os.environ.get("OUTBOX_SWEEP_SECONDS", 30))
+SWEEP_MIN_AGE_SECONDS = float(os.environ.get("OUTBOX_SWEEP_MIN_AGE_SECONDS", 10))
+MAX_ATTEMPTS = 5
+
+def event(kind, incident_id=None, **payload):
+    return OutboxEvent(kind=kind, incident_id=incident_id, payload=json.dumps(payload),
+                       created_at=datetime.datetime.now(datetime.timezone.utc), attempts=0)
+
+# Handlers: kind -> fn(db, events), run inside the batch transaction
+def handle_predict(db, events):
+    ids = [e.incident_id for e in events]
+    rows = db.query(Incident.id, Incident.title, Incident.description, Incident.requester_id, Incident.created_at, Group.name).join(
+        Group, Group.id == Incident.assigned_group_id).filter(Incident.id.in_(ids)).all()
+    if not rows:
+        return
+    types = {e.incident_id: json.loads(e.payload or "{}").get("type", "General") for e in events}
+    hours = predictor.predict_hours([
+        {"title": r.title, "description": r.description, "group": r.name, "type": types[r.id]} for r in rows
+    ])
+    if hours is None:
+        return  # no model yet: nothing to record
+    # updated_at moves too, so incremental readers (SLA scan, export) see the prediction
+    now = datetime.datetime.now(datetime.timezone.utc)
+    db.bulk_update_mappings(Incident, [{"id": r.id, "predicted_hours": h, "updated_at": now} for r, h in zip(rows, hours)])
+    db.bulk_insert_mappings(IncidentJournal, [
+        {"incident_id": r.id, "author_user_id": r.requester_id, "status": "open",
+         "comment": f"Projected resolution: {h:.1f} hours", "created_at": r.created_at}
+        for r, h in zip(rows, hours)
+    ])
+    for r, h in zip(rows, hours):
+        routing.TRACKER.set_hours(r.id, h)
+    try:
+        drift.MONITOR.observe([(r.title, r.description) for r in rows])
+    except Exception:
+        log.exception("Drift token tracking failed")  # monitoring never fails the batch
+
+HANDLERS = {"predict": handle_predict}
+
+def process_batch(event_ids):
+    """Run one batch of pending events: one handler call per kind and a single commit."""
+    db = SessionLocal()
+    try:
+        events = db.query(OutboxEvent).filter(OutboxEvent.id.in_(event_ids), OutboxEvent.processed_at.is_(None)).all()
+        if not events:
+            return 0
+        by_kind = {}
+        for e in events:
+            by_kind.setdefault(e.kind, []).append(e)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            for kind, batch in by_kind.items():
+                handler = HANDLERS.get(kind)
+                if handler is None:
+                    raise ValueError(f"No outbox handler for {kind!r}")
+                handler(db, batch)
+            for e in events:
+                e.processed_at = now
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            log.exception("Outbox batch failed")
+            for e in db.query(OutboxEvent).filter(OutboxEvent.id.in_([e.id for e in events])).all():
+                e.attempts = (e.attempts or 0) + 1
+                e.last_error = str(exc)[:500]
+            db.commit()
+            return 0
+        return len(events)
+    finally:
+        db.close()
+
+def pending_ids(limit=1000, min_age=0.0):
+    db = SessionLocal()
+    try:
+        q = db.query(OutboxEvent.id).filter(OutboxEvent.processed_at.is_(None), OutboxEvent.attempts < MAX_ATTEMPTS)
+        if min_age:
+            q = q.filter(OutboxEvent.created_at < datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=min_age))
+        rows = q.order_by(OutboxEvent.id).limit(limit).all()
+        return [r[0] for r in rows]
+    finally:
+        db.close()
+
+class Dispatcher:
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._queued = set()
+
+    def notify(self, event_id):
+        """Hand a committed event to the workers. Safe to call from request threads."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, event_id)
+
+    def _put(self, event_id):
+        if event_id not in self._queued:
+            self._queued.add(event_id)
+            self.queue.put_nowait(event_id)
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Give concurrent requests a moment to land in the same batch
+            deadline = self.loop.time() + BATCH_WINDOW_SECONDS
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(process_batch, batch)
+            except Exception:
+                log.exception("Outbox worker failed")
+            finally:
+                self._queued.difference_update(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _sweeper(self):
+        while True:
+            try:
+                if await asyncio.to_thread(leader.is_leader):
+                    for event_id in await asyncio.to_thread(pending_ids, min_age=SWEEP_MIN_AGE_SECONDS):
+                        self._put(event_id)
+            except Exception:
+                log.exception("Outbox sweep failed")
+            await asyncio.sleep(SWEEP_SECONDS)
+
+    def start(self):
+        if self._tasks:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))  # first pass recovers rows left by a restart
+
+    async def drain(self):
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.loop = None
+
+dispatcher = Dispatcher()
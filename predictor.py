@@ -0,0 +1,106 @@
+# predictor.py
+# The model, and with it joblib, pandas and scikit-learn, loads on first use or from
+# load() in a background thread at startup, never when this module is imported.
+# A retrained pickle is picked up on the next prediction after its mtime changes.
+import os
+import time
+import threading
+
+MODEL_PATH = os.environ.get("MODEL_PATH", "resolution_model.pkl")
+FEATURES = ["title", "description", "group", "type"]
+RELOAD_CHECK_SECONDS = float(os.environ.get("MODEL_RELOAD_CHECK_SECONDS", 5))
+QUANTILES = (0.1, 0.5, 0.9)
+
+MODEL = None
+_loaded = False
+_mtime = None
+_checked = 0.0
+_lock = threading.Lock()
+_nodes = None  # (model, per-tree offsets, node values of every tree back to back)
+
+def _stat_mtime():
+    try:
+        return os.stat(MODEL_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def load():
+    """(Re)load MODEL_PATH if it changed since the last load. A failed reload keeps the previous model."""
+    global MODEL, _loaded, _mtime
+    with _lock:
+        mtime = _stat_mtime()
+        if _loaded and mtime == _mtime:
+            return MODEL
+        try:
+            import joblib
+            MODEL = joblib.load(MODEL_PATH)
+        except Exception:
+            if not _loaded:
+                MODEL = None
+        _loaded, _mtime = True, mtime
+    return MODEL
+
+def get_model():
+    global _checked
+    if not _loaded:
+        return load()
+    now = time.monotonic()
+    if now - _checked >= RELOAD_CHECK_SECONDS:
+        _checked = now
+        # While another thread reloads, keep serving the current model
+        if _stat_mtime() != _mtime and not _lock.locked():
+            return load()
+    return MODEL
+
+def preload():
+    """Load the model and build the interval lookup arrays now, e.g. in a server master before fork."""
+    model = load()
+    if model is not None:
+        _node_values(model)
+    return model
+
+def status():
+    model = MODEL
+    return {
+        "loaded": model is not None,
+        "load_attempted": _loaded,
+        "path": MODEL_PATH,
+        "mtime": None if _mtime is None else _mtime / 1e9,
+        "trees": len(model.named_steps["reg"].estimators_) if model is not None else None,
+    }
+
+def predict_hours(rows):
+    """Batch prediction for dicts with FEATURES keys; one pipeline pass for the whole batch."""
+    model = get_model()
+    if model is None or not rows:
+        return None
+    import pandas as pd
+    X = pd.DataFrame(rows, columns=FEATURES)
+    return [float(y) for y in model.predict(X)]
+
+def _node_values(model):
+    global _nodes
+    if _nodes is None or _nodes[0] is not model:
+        import numpy as np
+        trees = [e.tree_ for e in model.named_steps["reg"].estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+        _nodes = (model, offsets, np.concatenate([t.value[:, 0, 0] for t in trees]))
+    return _nodes[1], _nodes[2]
+
+def predict_intervals(rows, quantiles=QUANTILES):
+    """Point estimate and per-tree quantiles for each row: {"hours": mean, "p10": ..., "p50": ..., "p90": ...}.
+
+    One forest.apply pass gives every tree's leaf for every row; a single gather from the
+    concatenated node values turns that into a (rows, trees) matrix. Its mean over trees
+    is the forest's point prediction, so no second pass is needed."""
+    model = get_model()
+    if model is None or not rows:
+        return None
+    import numpy as np
+    import pandas as pd
+    Xt = model.named_steps["prep"].transform(pd.DataFrame(rows, columns=FEATURES))
+    offsets, values = _node_values(model)
+    per_tree = values[model.named_steps["reg"].apply(Xt) + offsets]
+    qs = np.quantile(per_tree, quantiles, axis=1).T
+    names = [f"p{round(q * 100)}" for q in quantiles]
+    return [{"hours": float(m), **{n: float(v) for n, v in zip(names, q)}} for m, q in zip(per_tree.mean(axis=1), qs)]
@@ -0,0 +1,129 @@
+# responses.py
+# Typed response rows built straight from column tuples and rendered with orjson.
+# Endpoints return ORJSONResponse directly, which skips FastAPI's jsonable_encoder walk.
+import base64
+import datetime
+from dataclasses import dataclass
+from typing import List, Optional
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import tuple_
+from sqlalchemy.orm import aliased
+
+from db_config import User, Group, Incident, IncidentJournal, ArchivedIncident, ArchivedJournal
+
+@dataclass(slots=True)
+class IncidentOut:
+    id: int
+    title: str
+    description: Optional[str]
+    status: Optional[str]
+    requester_id: int
+    assigned_group_id: int
+    assigned_to_user_id: Optional[int]
+    created_at: Optional[datetime.datetime]
+    updated_at: Optional[datetime.datetime]
+    closed_at: Optional[datetime.datetime]
+    predicted_hours: Optional[float]
+    group: Optional[str]
+    assigned_to: Optional[str]
+
+@dataclass(slots=True)
+class JournalOut:
+    id: int
+    author: Optional[str]
+    comment: str
+    status: Optional[str]
+    created_at: Optional[datetime.datetime]
+
+@dataclass(slots=True)
+class MyIncidentsOut:
+    incidents: List[IncidentOut]
+
+@dataclass(slots=True)
+class GroupQueueOut:
+    open_incidents: List[IncidentOut]
+
+@dataclass(slots=True)
+class AssignedIncidentsOut:
+    assigned_incidents: List[IncidentOut]
+
+@dataclass(slots=True)
+class IncidentDetailOut:
+    incident: IncidentOut
+    journals: List[JournalOut]
+    next_cursor: Optional[str]
+
+@dataclass(slots=True)
+class JournalPageOut:
+    journals: List[JournalOut]
+    next_cursor: Optional[str]
+
+@dataclass(slots=True)
+class IncidentChangeOut:
+    message: str
+    incident: IncidentOut
+
+# Column tuples in IncidentOut / JournalOut field order. The same builders serve the
+# hot tables and their archive copies, which share column names.
+Assignee = aliased(User)
+Author = aliased(User)
+
+def incident_query(db, archived=False):
+    t = ArchivedIncident if archived else Incident.__table__
+    cols = (
+        t.c.id, t.c.title, t.c.description, t.c.status, t.c.requester_id, t.c.assigned_group_id,
+        t.c.assigned_to_user_id, t.c.created_at, t.c.updated_at, t.c.closed_at, t.c.predicted_hours,
+        Group.name, Assignee.email,
+    )
+    return db.query(*cols).outerjoin(Group, Group.id == t.c.assigned_group_id).outerjoin(
+        Assignee, Assignee.id == t.c.assigned_to_user_id)
+
+def journal_query(db, archived=False):
+    t = ArchivedJournal if archived else IncidentJournal.__table__
+    return db.query(t.c.id, Author.email, t.c.comment, t.c.status, t.c.created_at).outerjoin(
+        Author, Author.id == t.c.author_user_id)
+
+def journal_page(db, incident_id, archived=False, limit=100, after=None, since=None, newest_first=False):
+    """One page of an incident's journals in (created_at, id) order, plus the cursor for the next one.
+
+    after: a next_cursor from an earlier page in the same order. since: a journal id; only
+    entries added after it are returned, which is how clients poll for new comments.
+    newest_first walks the timeline backwards, for showing the latest page first."""
+    t = ArchivedJournal if archived else IncidentJournal.__table__
+    q = journal_query(db, archived).filter(t.c.incident_id == incident_id)
+    if since is not None:
+        q = q.filter(t.c.id > since)
+    key = tuple_(t.c.created_at, t.c.id)
+    if after is not None:
+        q = q.filter(key < tuple_(*after) if newest_first else key > tuple_(*after))
+    order = (t.c.created_at.desc(), t.c.id.desc()) if newest_first else (t.c.created_at, t.c.id)
+    rows = q.order_by(*order).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return journals_out(rows), encode_cursor(rows[-1]) if more else None
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(f"{row.created_at.isoformat()}|{row.id}".encode()).decode()
+
+def decode_cursor(cursor):
+    """(created_at, id) from encode_cursor output, or None if the cursor is malformed."""
+    try:
+        ts, jid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(ts), int(jid)
+    except ValueError:
+        return None
+
+def incidents_out(rows):
+    return [IncidentOut(*r) for r in rows]
+
+def journals_out(rows):
+    return [JournalOut(*r) for r in rows]
+
+def incident_out(db, incident_id, archived=False):
+    t = ArchivedIncident if archived else Incident.__table__
+    row = incident_query(db, archived).filter(t.c.id == incident_id).first()
+    return IncidentOut(*row) if row else None
+
+def respond(content, status_code=200):
+    return ORJSONResponse(content, status_code=status_code)
@@ -0,0 +1,143 @@
+# routing.py
+import os
+import threading
+
+from db_config import SessionLocal, User, Group, GroupMembership, Incident
+from sla import OPEN_STATUSES
+from jobs import PeriodicTask
+
+def infer_type(title, description):
+    text = f"{title} {description}".lower()
+    if "network" in text or "vpn" in text or "wifi" in text:
+        return "Network"
+    if "server" in text or "database" in text or "db" in text:
+        return "Infra"
+    if "bug" in text or "error" in text or "ui" in text or "app" in text:
+        return "Software"
+    return "General"
+
+# infer_type() label -> owning group
+TYPE_TO_GROUP = {"Network": "Network", "Infra": "Infra", "Software": "Support", "General": "Support"}
+DEFAULT_GROUP = "Support"
+DEFAULT_HOURS = float(os.environ.get("ROUTING_DEFAULT_HOURS", 8))  # load weight until a prediction lands
+AUTO_ASSIGN = os.environ.get("ROUTING_AUTO_ASSIGN", "1") == "1"
+# With several server processes each sees only its own hooks; reload from the database this often (0: never)
+REFRESH_SECONDS = float(os.environ.get("ROUTING_REFRESH_SECONDS", 0))
+
+def route_group(db, ptype):
+    name = TYPE_TO_GROUP.get(ptype, DEFAULT_GROUP)
+    return db.query(Group).filter(Group.name == name).first()
+
+class LoadTracker:
+    """Live per-analyst load: the sum of predicted hours over their open assigned incidents.
+
+    Loaded from the database once, then kept current by the assign/update/close hooks so
+    picking an analyst never has to count tickets per request. pick() reserves DEFAULT_HOURS
+    for the analyst until assign(..., reserved=True) or unreserve(), so concurrent creates
+    don't all see the same load before any of them commits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.members = {}   # group_id -> {analyst_id}
+        self.emails = {}    # analyst_id -> email
+        self.load = {}      # analyst_id -> predicted hours in flight
+        self.assigned = {}  # incident_id -> (analyst_id, hours)
+        self.reserved = {}  # analyst_id -> picks not yet assigned; kept across refreshes
+
+    def warm(self, db):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            self._replace(*self._read(db))
+
+    def refresh(self, db):
+        """Rebuild from the database without blocking pick() during the queries."""
+        state = self._read(db)
+        with self._lock:
+            self._replace(*state)
+
+    def _read(self, db):
+        members, emails = {}, {}
+        rows = db.query(GroupMembership.group_id, User.id, User.email).join(User, User.id == GroupMembership.user_id).filter(
+            GroupMembership.is_active.is_(True), User.role == "analyst").all()
+        for group_id, user_id, email in rows:
+            members.setdefault(group_id, set()).add(user_id)
+            emails[user_id] = email
+        open_rows = db.query(Incident.id, Incident.assigned_to_user_id, Incident.predicted_hours).filter(
+            Incident.assigned_to_user_id.isnot(None), Incident.status.in_(OPEN_STATUSES)).all()
+        return members, emails, open_rows
+
+    def _replace(self, members, emails, open_rows):
+        self.members, self.emails, self.load, self.assigned = members, emails, {}, {}
+        for incident_id, analyst_id, hours in open_rows:
+            self._assign(incident_id, analyst_id, hours)
+        self.loaded = True
+
+    def _assign(self, incident_id, analyst_id, hours):
+        self._release(incident_id)
+        hours = DEFAULT_HOURS if hours is None else hours
+        self.assigned[incident_id] = (analyst_id, hours)
+        self.load[analyst_id] = self.load.get(analyst_id, 0.0) + hours
+
+    def _release(self, incident_id):
+        prev = self.assigned.pop(incident_id, None)
+        if prev:
+            self.load[prev[0]] = max(0.0, self.load.get(prev[0], 0.0) - prev[1])
+
+    def _unreserve(self, analyst_id):
+        n = self.reserved.get(analyst_id, 0) - 1
+        if n > 0:
+            self.reserved[analyst_id] = n
+        else:
+            self.reserved.pop(analyst_id, None)
+
+    # Hooks
+    def add_member(self, group_id, analyst_id, email):
+        with self._lock:
+            self.members.setdefault(group_id, set()).add(analyst_id)
+            self.emails[analyst_id] = email
+
+    def assign(self, incident_id, analyst_id, hours=None, reserved=False):
+        with self._lock:
+            if reserved:
+                self._unreserve(analyst_id)
+            self._assign(incident_id, analyst_id, hours)
+
+    def release(self, incident_id):
+        with self._lock:
+            self._release(incident_id)
+
+    def unreserve(self, analyst_id):
+        with self._lock:
+            self._unreserve(analyst_id)
+
+    def set_hours(self, incident_id, hours):
+        with self._lock:
+            prev = self.assigned.get(incident_id)
+            if prev and hours is not None:
+                self._assign(incident_id, prev[0], hours)
+
+    def pick(self, group_id):
+        """Least-loaded active analyst in the group (now reserved for the caller), or None when nobody has joined it."""
+        with self._lock:
+            candidates = self.members.get(group_id)
+            if not candidates:
+                return None
+            analyst_id = min(candidates, key=lambda a: (self.load.get(a, 0.0) + self.reserved.get(a, 0) * DEFAULT_HOURS, a))
+            self.reserved[analyst_id] = self.reserved.get(analyst_id, 0) + 1
+            return analyst_id, self.emails.get(analyst_id)
+
+TRACKER = LoadTracker()
+
+def refresh_once():
+    db = SessionLocal()
+    try:
+        TRACKER.refresh(db)
+    finally:
+        db.close()
+
+refresher = PeriodicTask("Routing refresh", refresh_once, REFRESH_SECONDS)
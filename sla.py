@@ -0,0 +1,219 @@
+# sla.py
+import os
+import heapq
+import datetime
+import secrets
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from db_config import (SessionLocal, get_db, as_utc, User, Group, Incident, IncidentJournal,
+                       SlaPolicy, SlaBreach)
+from auth import TokenUser, current_user, current_analyst
+from jobs import PeriodicTask
+import leader
+
+OPEN_STATUSES = ("open", "assigned", "in-progress")
+DEFAULT_TARGET_HOURS = float(os.environ.get("SLA_DEFAULT_TARGET_HOURS", 24))
+DEFAULT_AT_RISK_RATIO = 0.8
+SCAN_INTERVAL_SECONDS = float(os.environ.get("SLA_SCAN_INTERVAL_SECONDS", 60))
+# updated_at is stamped before the commit, so rows can commit out of order: each delta
+# re-reads this far behind the watermark (re-applying a row is harmless)
+WATERMARK_LAG_SECONDS = float(os.environ.get("SLA_WATERMARK_LAG_SECONDS", 60))
+SYSTEM_EMAIL = "sla-bot@system.local"
+
+def _hours(h):
+    return datetime.timedelta(hours=h)
+
+class SlaEngine:
+    """In-memory view of the open backlog, kept current from an updated_at watermark.
+
+    The first scan loads open incidents through ix_incidents_status_created_at. Later scans
+    only read incidents touched since the watermark (less WATERMARK_LAG_SECONDS), and
+    deadlines are popped off heaps, so a tick costs O(changed + newly due * log n) instead
+    of a pass over every open ticket.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.loaded = False
+            self.entries = {}      # incident_id -> (group_id, at_risk_at, deadline)
+            self.risk_heap = []    # (at_risk_at, incident_id)
+            self.breach_heap = []  # (deadline, incident_id)
+            self.at_risk = {}      # group_id -> {incident_id}
+            self.breached = {}     # group_id -> {incident_id}
+            self.journaled = set() # incident ids that already have a breach recorded
+            self.watermark = None
+            self.policies = None
+            self.recording = False
+            self.last_scan = None
+
+    # State maintenance
+    def _policy_hours(self, policies, group_id, predicted_hours):
+        if group_id in policies:
+            return policies[group_id]
+        return (predicted_hours or DEFAULT_TARGET_HOURS), DEFAULT_AT_RISK_RATIO
+
+    def _discard(self, incident_id):
+        entry = self.entries.pop(incident_id, None)
+        if entry:
+            self.at_risk.get(entry[0], set()).discard(incident_id)
+            self.breached.get(entry[0], set()).discard(incident_id)
+
+    def _track(self, policies, incident_id, group_id, created_at, predicted_hours):
+        target, ratio = self._policy_hours(policies, group_id, predicted_hours)
+        created_at = as_utc(created_at)
+        entry = (group_id, created_at + _hours(target * ratio), created_at + _hours(target))
+        if self.entries.get(incident_id) == entry:
+            return
+        self._discard(incident_id)
+        self.entries[incident_id] = entry
+        heapq.heappush(self.risk_heap, (entry[1], incident_id))
+        heapq.heappush(self.breach_heap, (entry[2], incident_id))
+
+    def _apply(self, policies, rows):
+        for incident_id, group_id, status, created_at, predicted_hours in rows:
+            if status in OPEN_STATUSES and created_at is not None:
+                self._track(policies, incident_id, group_id, created_at, predicted_hours)
+            else:
+                self._discard(incident_id)
+
+    def _advance(self, now):
+        """Pop everything that became due since the last tick; returns newly breached entries."""
+        while self.risk_heap and self.risk_heap[0][0] <= now:
+            at, incident_id = heapq.heappop(self.risk_heap)
+            entry = self.entries.get(incident_id)
+            if entry and entry[1] == at:  # skip stale heap items left by re-tracked incidents
+                self.at_risk.setdefault(entry[0], set()).add(incident_id)
+        new_breaches = []
+        while self.breach_heap and self.breach_heap[0][0] <= now:
+            at, incident_id = heapq.heappop(self.breach_heap)
+            entry = self.entries.get(incident_id)
+            if not entry or entry[2] != at:
+                continue
+            self.at_risk.get(entry[0], set()).discard(incident_id)
+            self.breached.setdefault(entry[0], set()).add(incident_id)
+            if incident_id not in self.journaled:
+                new_breaches.append((incident_id, entry))
+        return new_breaches
+
+    # Scanning
+    def scan(self, db: Session, now=None, record=True):
+        """One tick. With record=False (not the leader process) only the in-memory view is updated."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        cols = (Incident.id, Incident.assigned_group_id, Incident.status, Incident.created_at, Incident.predicted_hours)
+        policies = {p.group_id: (p.target_hours, p.at_risk_ratio or DEFAULT_AT_RISK_RATIO) for p in db.query(SlaPolicy).all()}
+        if self.loaded and (policies != self.policies or record != self.recording):
+            # A policy changed (maybe in another process), or this process just became the leader
+            # and must journal what it skipped as a follower: rebuild from the database
+            self.reset()
+        with self._lock:
+            self.policies, self.recording = policies, record
+            if not self.loaded:
+                # Take the watermark first so anything written during the load is re-read by the next delta
+                self.watermark = db.query(Incident.updated_at).order_by(Incident.updated_at.desc()).limit(1).scalar()
+                rows = db.query(*cols).filter(Incident.status.in_(OPEN_STATUSES)).order_by(Incident.created_at).all()
+                self.journaled = {r[0] for r in db.query(SlaBreach.incident_id).all()}
+                self.loaded = True
+            else:
+                lag = datetime.timedelta(seconds=WATERMARK_LAG_SECONDS)
+                q = db.query(*cols, Incident.updated_at)
+                if self.watermark is not None:
+                    q = q.filter(Incident.updated_at >= self.watermark - lag)
+                delta = q.all()
+                rows = [r[:5] for r in delta]
+                stamps = [r[5] for r in delta if r[5] is not None]
+                if stamps:
+                    self.watermark = max(self.watermark or stamps[0], *stamps)
+            self._apply(policies, rows)
+            new_breaches = self._advance(now)
+            if record:
+                self._record(db, new_breaches, now)
+            self.last_scan = now
+        return len(rows), len(new_breaches)
+
+    def _record(self, db, new_breaches, now):
+        """Write breach rows and their journal entries in one batch; idle ticks don't write."""
+        if not new_breaches:
+            return
+        author_id = system_user_id(db)
+        statuses = dict(db.query(Incident.id, Incident.status).filter(Incident.id.in_([i for i, _ in new_breaches])).all())
+        db.bulk_insert_mappings(SlaBreach, [
+            {"incident_id": i, "group_id": e[0], "deadline": e[2], "breached_at": now} for i, e in new_breaches
+        ])
+        db.bulk_insert_mappings(IncidentJournal, [
+            {"incident_id": i, "author_user_id": author_id, "status": statuses.get(i),
+             "comment": f"SLA breached: resolution target passed at {e[2]:%Y-%m-%d %H:%M} UTC", "created_at": now}
+            for i, e in new_breaches
+        ])
+        self.journaled.update(i for i, _ in new_breaches)
+        db.commit()
+
+    def snapshot(self, group_id, now=None):
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            def rows(ids):
+                return sorted(
+                    ({"incident_id": i, "deadline": self.entries[i][2],
+                      "hours_left": round((self.entries[i][2] - now).total_seconds() / 3600.0, 2)}
+                     for i in ids if i in self.entries),
+                    key=lambda r: r["deadline"])
+            return {"at_risk": rows(self.at_risk.get(group_id, ())),
+                    "breached": rows(self.breached.get(group_id, ())),
+                    "scanned_at": self.last_scan}
+
+ENGINE = SlaEngine()
+
+def system_user_id(db):
+    u = db.query(User.id).filter(User.email == SYSTEM_EMAIL).scalar()
+    if u is None:
+        bot = User(username="sla-bot", email=SYSTEM_EMAIL, password=secrets.token_urlsafe(24), role="system")
+        db.add(bot); db.flush()
+        u = bot.id
+    return u
+
+def scan_once():
+    db = SessionLocal()
+    try:
+        return ENGINE.scan(db, record=leader.is_leader())
+    finally:
+        db.close()
+
+# Background scheduler, started from the API lifespan in every process so each can serve
+# /sla/at_risk; only the leader writes breaches
+scheduler = PeriodicTask("SLA scan", scan_once, SCAN_INTERVAL_SECONDS)
+
+# Schemas
+class PolicyData(BaseModel):
+    group_name: str
+    target_hours: float
+    at_risk_ratio: float = DEFAULT_AT_RISK_RATIO
+
+# Endpoints
+router = APIRouter(prefix="/sla")
+
+@router.get("/at_risk")
+def at_risk(group_name: str, user: TokenUser = Depends(current_user), db: Session = Depends(get_db)):
+    group = db.query(Group).filter(Group.name == group_name).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return {"group": group.name, **ENGINE.snapshot(group.id)}
+
+@router.post("/policies")
+def set_policy(data: PolicyData, user: TokenUser = Depends(current_analyst), db: Session = Depends(get_db)):
+    if data.target_hours <= 0 or not 0 < data.at_risk_ratio <= 1:
+        raise HTTPException(status_code=400, detail="target_hours must be > 0 and at_risk_ratio in (0, 1]")
+    group = db.query(Group).filter(Group.name == data.group_name).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    p = db.query(SlaPolicy).filter(SlaPolicy.group_id == group.id).first() or SlaPolicy(group_id=group.id)
+    p.target_hours = data.target_hours; p.at_risk_ratio = data.at_risk_ratio
+    db.add(p); db.commit()
+    ENGINE.reset()  # deadlines depend on the policy; rebuild on the next tick
+    return {"message": "Policy saved", "group": group.name, "target_hours": p.target_hours, "at_risk_ratio": p.at_risk_ratio}
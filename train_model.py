@@ -1,5 +1,8 @@
 # train_model.py
+import os
+import sys
 import math
+import datetime
 import joblib
 import pandas as pd
 from sqlalchemy.orm import Session
@@ -9,7 +12,14 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor
 
-from db_config import SessionLocal, Incident, Group
+from db_config import SessionLocal, Incident, Group, ArchivedIncident
+from predictor import MODEL_PATH, FEATURES
+
+# --incremental: grow the saved forest by this many trees, fit on incidents closed in the last INCREMENTAL_DAYS
+INCREMENTAL_TREES = int(os.environ.get("INCREMENTAL_TREES", 50))
+INCREMENTAL_DAYS = float(os.environ.get("INCREMENTAL_DAYS", 30))
+INCREMENTAL_MIN_ROWS = 20
+MAX_TREES = int(os.environ.get("MAX_TREES", 600))
 
 def hours_between(a, b):
     if not a or not b:
@@ -17,29 +27,49 @@ def hours_between(a, b):
     diff = (b - a).total_seconds() / 3600.0
     return diff if diff >= 0 else None
 
-def fetch_training_data():
+def fetch_training_data(since=None):
     db: Session = SessionLocal()
     try:
-        # Use only incidents with a closed_at to compute resolution time
-        incidents = db.query(Incident).filter(Incident.closed_at.isnot(None)).all()
+        # Use only incidents with a closed_at to compute resolution time,
+        # including the ones already moved to the archive database
         rows = []
-        for i in incidents:
-            group_name = i.assigned_group.name if i.assigned_group else "Unknown"
-            rt_hours = hours_between(i.created_at, i.closed_at)
-            if rt_hours is None:
-                continue
-            rows.append({
-                "title": i.title or "",
-                "description": i.description or "",
-                "group": group_name or "",
-                # Optional: derive type. If you have explicit type field, replace this.
-                "type": infer_type(i.title, i.description),
-                "resolution_time_hours": rt_hours
-            })
+        for t in (Incident.__table__, ArchivedIncident):
+            q = db.query(t.c.title, t.c.description, Group.name, t.c.created_at, t.c.closed_at).outerjoin(
+                Group, Group.id == t.c.assigned_group_id).filter(t.c.closed_at.isnot(None))
+            if since is not None:
+                q = q.filter(t.c.closed_at >= since)
+            incidents = q.all()
+            for title, description, group_name, created_at, closed_at in incidents:
+                rt_hours = hours_between(created_at, closed_at)
+                if rt_hours is None:
+                    continue
+                rows.append({
+                    "title": title or "",
+                    "description": description or "",
+                    "group": group_name or "Unknown",
+                    # Optional: derive type. If you have explicit type field, replace this.
+                    "type": infer_type(title, description),
+                    "resolution_time_hours": rt_hours
+                })
         return pd.DataFrame(rows)
     finally:
         db.close()
 
+def fetch_training_data_from_export():
+    # Reads the Parquet snapshot written by export_data.py instead of the live database
+    from export_data import read_frame
+    incs = read_frame("incidents", columns=["title", "description", "assigned_group_id", "created_at", "closed_at"])
+    incs = incs[incs["closed_at"].notna()]
+    groups = read_frame("groups").rename(columns={"id": "assigned_group_id", "name": "group"})
+    df = incs.merge(groups, on="assigned_group_id", how="left")
+    df["resolution_time_hours"] = (df["closed_at"] - df["created_at"]).dt.total_seconds() / 3600.0
+    df = df[df["resolution_time_hours"] >= 0]
+    df["title"] = df["title"].fillna("")
+    df["description"] = df["description"].fillna("")
+    df["group"] = df["group"].fillna("Unknown")
+    df["type"] = [infer_type(t, d) for t, d in zip(df["title"], df["description"])]
+    return df[["title", "description", "group", "type", "resolution_time_hours"]].reset_index(drop=True)
+
 def infer_type(title, description):
     text = f"{title} {description}".lower()
     if "network" in text or "vpn" in text or "wifi" in text:
@@ -50,15 +80,7 @@ def infer_type(title, description):
         return "Software"
     return "General"
 
-def main():
-    df = fetch_training_data()
-    if df.empty:
-        print("❌ No closed incidents with resolution times found. Train after you have historical data.")
-        return
-
-    X = df[["title", "description", "group", "type"]]
-    y = df["resolution_time_hours"]
-
+def build_pipeline(n_estimators=300):
     preprocessor = ColumnTransformer(
         transformers=[
             ("desc", TfidfVectorizer(max_features=1000), "description"),
@@ -67,14 +89,53 @@ def main():
         ]
     )
 
-    model = Pipeline([
+    return Pipeline([
         ("prep", preprocessor),
-        ("reg", RandomForestRegressor(n_estimators=300, random_state=42))
+        ("reg", RandomForestRegressor(n_estimators=n_estimators, random_state=42))
     ])
 
+def save(model):
+    # Write then rename, so the API never reloads a half-written pickle
+    tmp = f"{MODEL_PATH}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, MODEL_PATH)
+
+def incremental():
+    """Warm-start the saved forest with trees fit on recent closes. The fitted TF-IDF
+    vocabularies stay as they are; new vocabulary needs a full retrain."""
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=INCREMENTAL_DAYS)
+    df = fetch_training_data(since=since)
+    if len(df) < INCREMENTAL_MIN_ROWS:
+        print(f"❌ Only {len(df)} incidents closed in the last {INCREMENTAL_DAYS:g} days, not retraining.")
+        return
+    model = joblib.load(MODEL_PATH)
+    prep, reg = model.named_steps["prep"], model.named_steps["reg"]
+    reg.set_params(warm_start=True, n_estimators=len(reg.estimators_) + INCREMENTAL_TREES)
+    reg.fit(prep.transform(df[FEATURES]), df["resolution_time_hours"])
+    if len(reg.estimators_) > MAX_TREES:
+        # Oldest trees go first, which keeps the model size bounded
+        reg.estimators_ = reg.estimators_[-MAX_TREES:]
+        reg.n_estimators = MAX_TREES
+    save(model)
+    print(f"✅ Added {INCREMENTAL_TREES} trees fit on {len(df)} recent incidents ({len(reg.estimators_)} total), saved to {MODEL_PATH}")
+
+def main():
+    # python train_model.py --from-export  trains on exports/ instead of app.db
+    # python train_model.py --incremental  adds trees for recent closes to the saved model
+    if "--incremental" in sys.argv and os.path.exists(MODEL_PATH):
+        return incremental()
+    df = fetch_training_data_from_export() if "--from-export" in sys.argv else fetch_training_data()
+    if df.empty:
+        print("❌ No closed incidents with resolution times found. Train after you have historical data.")
+        return
+
+    X = df[FEATURES]
+    y = df["resolution_time_hours"]
+
+    model = build_pipeline()
     model.fit(X, y)
-    joblib.dump(model, "resolution_model.pkl")
-    print(f"✅ Trained on {len(df)} incidents, saved to resolution_model.pkl")
+    save(model)
+    print(f"✅ Trained on {len(df)} incidents, saved to {MODEL_PATH}")
 
 if __name__ == "__main__":
     main()